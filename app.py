@@ -1,30 +1,43 @@
 import streamlit as st
+import os
 import pandas as pd
+import numpy as np
 import pickle
-import networkx as nx
-import matplotlib.pyplot as plt
 from matplotlib.patches import Patch
 
+from lean_model import load_lean_model
+from road_speeds import (
+    ROAD_DISTANCE_KM,
+    file_sha256,
+    load_speed_table,
+    lookup_road_speeds,
+    predict_road_speeds,
+)
+from city_render import draw_route_map, render_base_map
+from routing import (
+    astar_path,
+    build_grid_road_graph,
+    build_road_node_lookup,
+    node_coords,
+    path_to_root,
+    shortest_path_tree,
+    snap_to_nodes,
+)
+
 # ============================
 # App title
 # ============================
 st.title("SafeFlow AI 🚦")
 st.subheader("AI-powered school route optimization")
 
-# ============================
-# Load trained ML model
-# ============================
-with open("safeflow_speed_model.pkl", "rb") as f:
-    automl = pickle.load(f)
-
-# ============================
-# Load city data
-# ============================
-roads = pd.read_csv("roads_raw.csv")
-neighborhoods = pd.read_csv("neighborhoods.csv")
-
 GRID_SIZE = 20
-ROAD_DISTANCE_KM = 0.1
+ROADS_PATH = "roads_raw.csv"
+NEIGHBORHOODS_PATH = "neighborhoods.csv"
+MODEL_PATH = "safeflow_speed_model.pkl"
+LEAN_MODEL_PATH = "safeflow_speed_model.npz"
+SPEED_TABLE_PATH = "speed_table.npy"
+
+SCHOOL_X, SCHOOL_Y = 17, 18
 
 # ============================
 # Human-readable neighborhood names
@@ -39,118 +52,209 @@ NEIGHBORHOOD_NAMES = [
     "Cedar Park",
     "Lakeside"
 ]
-neighborhoods["display_name"] = NEIGHBORHOOD_NAMES[:len(neighborhoods)]
 
 # ============================
 # Cell types
 # ============================
 EMPTY, ROAD, HOUSE, SCHOOL, PARK, GROCERY, STORE = range(7)
 
+# ============================
+# Cached loaders (keyed by file content hash)
+# ============================
+# Every cached step takes the sha256 of the files it reads, so editing a
+# CSV or retraining the model invalidates it on the next rerun while
+# slider / radio changes reuse the cached objects.
+@st.cache_data(show_spinner=False)
+def file_digest(path, mtime_ns, size):
+    return file_sha256(path)
+
+
+def current_digest(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return file_digest(path, stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_resource(show_spinner="Loading speed model...")
+def load_model(path, digest):
+    if path.endswith(".npz"):
+        return load_lean_model(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+@st.cache_resource(show_spinner=False)
+def load_cached_speed_table(path, digest):
+    return load_speed_table(path)
+
+
+@st.cache_data(show_spinner=False)
+def load_city(roads_path, roads_digest, neighborhoods_path, neighborhoods_digest):
+    roads = pd.read_csv(roads_path)
+    neighborhoods = pd.read_csv(neighborhoods_path)
+    neighborhoods["display_name"] = NEIGHBORHOOD_NAMES[:len(neighborhoods)]
+    return roads, neighborhoods
+
+
 # ============================
 # Build city grid (VISUAL ONLY)
 # ============================
-city_grid = [[EMPTY for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-
-# Roads
-for _, r in roads.iterrows():
-    city_grid[r["from_y"]][r["from_x"]] = ROAD
-    city_grid[r["to_y"]][r["to_x"]] = ROAD
-
-# Neighborhood housing clusters (2x2)
-for _, n in neighborhoods.iterrows():
-    for dx in [0, 1]:
-        for dy in [0, 1]:
-            x, y = n["x"] + dx, n["y"] + dy
-            if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE:
+@st.cache_resource(show_spinner=False)
+def build_city_grid(_roads, _neighborhoods, roads_digest, neighborhoods_digest):
+    city_grid = [[EMPTY for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+
+    # Roads
+    for _, r in _roads.iterrows():
+        city_grid[r["from_y"]][r["from_x"]] = ROAD
+        city_grid[r["to_y"]][r["to_x"]] = ROAD
+
+    # Neighborhood housing clusters (2x2)
+    for _, n in _neighborhoods.iterrows():
+        for dx in [0, 1]:
+            for dy in [0, 1]:
+                x, y = n["x"] + dx, n["y"] + dy
+                if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE:
+                    if city_grid[y][x] == EMPTY:
+                        city_grid[y][x] = HOUSE
+
+    # Large parks (3x4)
+    parks = [(2, 2), (11, 3), (6, 9)]
+    for px, py in parks:
+        for dx in range(3):
+            for dy in range(4):
+                x, y = px + dx, py + dy
                 if city_grid[y][x] == EMPTY:
-                    city_grid[y][x] = HOUSE
-
-# Large parks (3x4)
-parks = [(2, 2), (11, 3), (6, 9)]
-for px, py in parks:
-    for dx in range(3):
-        for dy in range(4):
-            x, y = px + dx, py + dy
-            if city_grid[y][x] == EMPTY:
-                city_grid[y][x] = PARK
+                    city_grid[y][x] = PARK
+
+    # Commercial store clusters
+    for cx, cy in [(13, 11), (4, 14)]:
+        for dx in [0, 1]:
+            for dy in [0, 1]:
+                x, y = cx + dx, cy + dy
+                if city_grid[y][x] == EMPTY:
+                    city_grid[y][x] = STORE
+
+    # Grocery stores (more, realistic spacing)
+    grocery_locations = [
+        (8, 6),
+        (15, 9),
+        (5, 3),
+        (12, 5),
+        (3, 10),
+        (10, 14)
+    ]
+    for gx, gy in grocery_locations:
+        if city_grid[gy][gx] != ROAD:
+            city_grid[gy][gx] = GROCERY
+
+    # School campus (2x2, directly next to road)
+    school_zone = [(16,17), (17,17), (16,18), (17,18)]
+    for x, y in school_zone:
+        if city_grid[y][x] != ROAD:
+            city_grid[y][x] = SCHOOL
 
-# Commercial store clusters
-for cx, cy in [(13, 11), (4, 14)]:
-    for dx in [0, 1]:
-        for dy in [0, 1]:
-            x, y = cx + dx, cy + dy
+    # Fill remaining empty cells with housing
+    for y in range(GRID_SIZE):
+        for x in range(GRID_SIZE):
             if city_grid[y][x] == EMPTY:
-                city_grid[y][x] = STORE
-
-# Grocery stores (more, realistic spacing)
-grocery_locations = [
-    (8, 6),
-    (15, 9),
-    (5, 3),
-    (12, 5),
-    (3, 10),
-    (10, 14)
-]
-for gx, gy in grocery_locations:
-    if city_grid[gy][gx] != ROAD:
-        city_grid[gy][gx] = GROCERY
+                city_grid[y][x] = HOUSE
 
-# School campus (2x2, directly next to road)
-SCHOOL_X, SCHOOL_Y = 17, 18
-school_zone = [(16,17), (17,17), (16,18), (17,18)]
-for x, y in school_zone:
-    if city_grid[y][x] != ROAD:
-        city_grid[y][x] = SCHOOL
+    return city_grid
+
+
+# ============================
+# Helper: snap to nearest road
+# ============================
+@st.cache_resource(show_spinner=False)
+def build_nearest_road_lookup(_roads, roads_digest):
+    return build_road_node_lookup(_roads, GRID_SIZE)
 
-# Fill remaining empty cells with housing
-for y in range(GRID_SIZE):
-    for x in range(GRID_SIZE):
-        if city_grid[y][x] == EMPTY:
-            city_grid[y][x] = HOUSE
+# ============================
+# Load city data
+# ============================
+roads_digest = current_digest(ROADS_PATH)
+neighborhoods_digest = current_digest(NEIGHBORHOODS_PATH)
+
+roads, neighborhoods = load_city(ROADS_PATH, roads_digest, NEIGHBORHOODS_PATH, neighborhoods_digest)
+city_grid = build_city_grid(roads, neighborhoods, roads_digest, neighborhoods_digest)
+nearest_road = build_nearest_road_lookup(roads, roads_digest)
+
+# ============================
+# Speed source: precomputed table or trained ML model
+# ============================
+# Run precompute_speeds.py to build the table; it is only used while it
+# still matches the current roads and model files.
+model_digest = current_digest(MODEL_PATH)
+table_digest = current_digest(SPEED_TABLE_PATH)
+
+speed_table = None
+if table_digest is not None:
+    table, meta = load_cached_speed_table(SPEED_TABLE_PATH, table_digest)
+    if (
+        meta["roads_sha256"] == roads_digest
+        and meta["school_x"] == SCHOOL_X
+        and (model_digest is None or meta["model_sha256"] == model_digest)
+    ):
+        speed_table = table
+
+# Prefer the lean export of the model (see lean_model.py) when it was
+# exported from the current pickle; it avoids importing flaml entirely.
+lean_digest = current_digest(LEAN_MODEL_PATH)
+
+if speed_table is None:
+    automl = None
+    if lean_digest is not None:
+        lean = load_model(LEAN_MODEL_PATH, lean_digest)
+        if model_digest is None or lean.meta.get("source_sha256") == model_digest:
+            automl = lean
+            speed_digest = lean_digest
+    if automl is None:
+        automl = load_model(MODEL_PATH, model_digest)
+        speed_digest = model_digest
+else:
+    speed_digest = table_digest
 
 # ============================
 # Visualization
 # ============================
-def draw_city(grid, path=None):
-    color_map = {
-        ROAD: "#bdbdbd",
-        HOUSE: "#ffcc99",
-        PARK: "#99cc99",
-        GROCERY: "#66b2ff",
-        STORE: "#cc99ff",
-        SCHOOL: "#fff2cc"
-    }
-
-    label_map = {
-        HOUSE: "H",
-        PARK: "P",
-        GROCERY: "G",
-        STORE: "T"
-    }
-
-    fig, ax = plt.subplots(figsize=(7.5, 7.5))
+CELL_COLORS = {
+    ROAD: "#bdbdbd",
+    HOUSE: "#ffcc99",
+    PARK: "#99cc99",
+    GROCERY: "#66b2ff",
+    STORE: "#cc99ff",
+    SCHOOL: "#fff2cc"
+}
+
+CELL_LABELS = {
+    HOUSE: "H",
+    PARK: "P",
+    GROCERY: "G",
+    STORE: "T"
+}
+
+LEGEND_ELEMENTS = [
+    Patch(facecolor="#bdbdbd", label="Road"),
+    Patch(facecolor="#ffcc99", label="Neighborhood (H)"),
+    Patch(facecolor="#99cc99", label="Park (P)"),
+    Patch(facecolor="#66b2ff", label="Grocery (G)"),
+    Patch(facecolor="#cc99ff", label="Store (T)"),
+    Patch(facecolor="#fff2cc", label="School Campus"),
+    Patch(facecolor="red", label="Optimal Route")
+]
 
-    for y in range(GRID_SIZE):
-        for x in range(GRID_SIZE):
-            ax.add_patch(
-                plt.Rectangle(
-                    (x, GRID_SIZE - y - 1),
-                    1, 1,
-                    color=color_map.get(grid[y][x], "#f5f5f5"),
-                    ec="white"
-                )
-            )
-
-            if grid[y][x] in label_map:
-                ax.text(
-                    x + 0.5,
-                    GRID_SIZE - y - 0.5,
-                    label_map[grid[y][x]],
-                    ha="center",
-                    va="center",
-                    fontsize=9,
-                    fontweight="bold"
-                )
+
+# The static city is rendered once into an image; each route request only
+# draws that image plus the route line.
+@st.cache_resource(show_spinner=False)
+def build_base_map(_grid, roads_digest, neighborhoods_digest):
+    return render_base_map(_grid, CELL_COLORS, CELL_LABELS)
+
+
+def draw_city(base_map, path=None):
+    xs, ys = node_coords(path, GRID_SIZE) if path is not None else (None, None)
+    fig, ax = draw_route_map(base_map, GRID_SIZE, xs, ys)
 
     # School star (centered on campus)
     ax.scatter(
@@ -163,31 +267,10 @@ def draw_city(grid, path=None):
         zorder=6
     )
 
-    # Route
-    if path:
-        coords = [(int(p[1:-1].split(",")[0]), int(p[1:-1].split(",")[1])) for p in path]
-        xs = [x + 0.5 for x, y in coords]
-        ys = [GRID_SIZE - y - 0.5 for x, y in coords]
-        ax.plot(xs, ys, color="red", linewidth=3)
-
-    ax.set_xlim(0, GRID_SIZE)
-    ax.set_ylim(0, GRID_SIZE)
-    ax.set_xticks([])
-    ax.set_yticks([])
     ax.set_title("SafeFlow AI – City Map & Optimal Route")
 
-    legend_elements = [
-        Patch(facecolor="#bdbdbd", label="Road"),
-        Patch(facecolor="#ffcc99", label="Neighborhood (H)"),
-        Patch(facecolor="#99cc99", label="Park (P)"),
-        Patch(facecolor="#66b2ff", label="Grocery (G)"),
-        Patch(facecolor="#cc99ff", label="Store (T)"),
-        Patch(facecolor="#fff2cc", label="School Campus"),
-        Patch(facecolor="red", label="Optimal Route")
-    ]
-
     ax.legend(
-        handles=legend_elements,
+        handles=LEGEND_ELEMENTS,
         loc="center left",
         bbox_to_anchor=(1.02, 0.5),
         frameon=False
@@ -195,17 +278,8 @@ def draw_city(grid, path=None):
 
     return fig
 
-# ============================
-# Helper: snap to nearest road
-# ============================
-def find_nearest_road_node(nx0, ny0, roads_df):
-    best, best_dist = None, 1e9
-    for _, r in roads_df.iterrows():
-        for x, y in [(r["from_x"], r["from_y"]), (r["to_x"], r["to_y"])]:
-            d = abs(nx0 - x) + abs(ny0 - y)
-            if d < best_dist:
-                best, best_dist = (x, y), d
-    return f"({best[0]},{best[1]})"
+
+base_map = build_base_map(city_grid, roads_digest, neighborhoods_digest)
 
 # ============================
 # User inputs
@@ -213,67 +287,71 @@ def find_nearest_road_node(nx0, ny0, roads_df):
 hour = st.slider("Hour of day", 0, 23, 8)
 weather = st.selectbox("Weather", ["clear", "rain", "fog"])
 priority = st.radio("Route preference", ["Shortest distance", "Least congestion", "Balanced"])
+search = st.radio("Search", ["School route tree", "A*"], horizontal=True)
 
 start_name = st.selectbox("Choose neighborhood", neighborhoods["display_name"])
 start_row = neighborhoods[neighborhoods["display_name"] == start_name].iloc[0]
 
-start_node = find_nearest_road_node(start_row["x"], start_row["y"], roads)
-school_node = find_nearest_road_node(SCHOOL_X, SCHOOL_Y, roads)
+start_node = int(snap_to_nodes(nearest_road, start_row["x"], start_row["y"]))
+school_node = int(snap_to_nodes(nearest_road, SCHOOL_X, SCHOOL_Y))
 
 # ============================
-# Build routing graph
+# Routing graph (cached per weight setting)
 # ============================
-G = nx.Graph()
-
-for _, road in roads.iterrows():
-    features = {
-        "hour": hour,
-        "day_of_week": 1,
-        "is_school_day": 1,
-        "is_arrival_time": int(7 <= hour <= 9),
-        "is_dismissal_time": int(14 <= hour <= 16),
-        "weather_condition": weather,
-        "precipitation": int(weather == "rain"),
-        "visibility_level": "low" if weather in ["rain", "fog"] else "high",
-        "num_lanes": 2,
-        "speed_limit": 30,
-        "distance_km": ROAD_DISTANCE_KM,
-        "is_intersection": 0,
-        "neighborhood_population": 5000,
-        "working_population_pct": 0.6,
-        "students_population": 800,
-        "distance_to_school_m": abs(road["to_x"] - SCHOOL_X) * 100
-    }
-
-    X = pd.get_dummies(pd.DataFrame([features]))
-    X = X.reindex(columns=automl.feature_names_in_, fill_value=0)
-
-    speed = max(5.0, automl.predict(X)[0])
-    travel_time = ROAD_DISTANCE_KM / speed
+@st.cache_resource(show_spinner=False, max_entries=256)
+def road_graph(hour, weather, priority, roads_digest, speed_digest, _roads, _speed_table, _model):
+    if _speed_table is not None:
+        speeds = lookup_road_speeds(_speed_table, hour, weather)
+    else:
+        speeds = predict_road_speeds(_model, _roads, hour, weather, SCHOOL_X)
+    travel_times = ROAD_DISTANCE_KM / speeds
 
     if priority == "Shortest distance":
-        weight = ROAD_DISTANCE_KM
+        weights = np.full(len(_roads), ROAD_DISTANCE_KM)
     elif priority == "Least congestion":
-        weight = travel_time
+        weights = travel_times
     else:
-        weight = 0.5 * ROAD_DISTANCE_KM + 0.5 * travel_time
+        weights = 0.5 * ROAD_DISTANCE_KM + 0.5 * travel_times
+
+    return build_grid_road_graph(_roads, weights, GRID_SIZE)
 
-    G.add_edge(
-        f"({road['from_x']},{road['from_y']})",
-        f"({road['to_x']},{road['to_y']})",
-        weight=weight
-    )
+
+# ============================
+# Routing tree (one search from the school, cached per weight setting)
+# ============================
+@st.cache_resource(show_spinner=False, max_entries=256)
+def school_route_tree(hour, weather, priority, school_node, roads_digest, speed_digest, _graph):
+    return shortest_path_tree(_graph, school_node)
 
 # ============================
 # Run routing + visualize
 # ============================
 if st.button("Find best route"):
-    path = nx.shortest_path(G, start_node, school_node, weight="weight")
-    cost = nx.shortest_path_length(G, start_node, school_node, weight="weight")
+    G = road_graph(
+        hour, weather, priority,
+        roads_digest,
+        speed_digest,
+        roads,
+        speed_table,
+        None if speed_table is not None else automl
+    )
+
+    if search == "A*":
+        path, cost, expanded = astar_path(G, start_node, school_node, GRID_SIZE)
+        _, _, dijkstra_expanded = astar_path(G, start_node, school_node, GRID_SIZE, step_cost=0.0)
+    else:
+        tree = school_route_tree(hour, weather, priority, school_node, roads_digest, speed_digest, G)
+        path, cost = path_to_root(tree, start_node)
+
+    if path is None:
+        st.error("No valid route found.")
+    else:
+        st.success("Best route found!")
+        st.write(f"From **{start_name}** to **School**")
+        st.write(f"Total route cost: {cost:.4f}")
 
-    st.success("Best route found!")
-    st.write(f"From **{start_name}** to **School**")
-    st.write(f"Total route cost: {cost:.4f}")
+        if search == "A*":
+            st.caption(f"A* expanded {expanded} nodes vs {dijkstra_expanded} for Dijkstra")
 
-    fig = draw_city(city_grid, path)
-    st.pyplot(fig)
+        fig = draw_city(base_map, path)
+        st.pyplot(fig)
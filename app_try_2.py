@@ -6,6 +6,9 @@ import matplotlib.pyplot as plt
 from matplotlib.patches import Patch
 import random
 
+from feature_encoder import load_encoder
+from routing import build_road_node_lookup, node_coords, snap_to_nodes
+
 # ============================
 # App title
 # ============================
@@ -18,6 +21,8 @@ st.subheader("AI-powered school route optimization")
 with open("safeflow_speed_model.pkl", "rb") as f:
     automl = pickle.load(f)
 
+encoder = load_encoder("safeflow_speed_model.pkl", automl)
+
 # ============================
 # Load city data
 # ============================
@@ -245,14 +250,11 @@ def draw_city(grid, path=None):
 # ============================
 # Helper: snap to nearest road
 # ============================
-def find_nearest_road_node(nx0, ny0, roads_df):
-    best, best_dist = None, 1e9
-    for _, r in roads_df.iterrows():
-        for x, y in [(r["from_x"], r["from_y"]), (r["to_x"], r["to_y"])]:
-            d = abs(nx0 - x) + abs(ny0 - y)
-            if d < best_dist:
-                best, best_dist = (x, y), d
-    return f"({best[0]},{best[1]})"
+nearest_road = build_road_node_lookup(roads, GRID_SIZE)
+
+def find_nearest_road_node(nx0, ny0):
+    x, y = node_coords(snap_to_nodes(nearest_road, nx0, ny0), GRID_SIZE)
+    return f"({x},{y})"
 
 # ============================
 # User inputs
@@ -264,8 +266,8 @@ priority = st.radio("Route preference", ["Shortest distance", "Least congestion"
 start_name = st.selectbox("Choose neighborhood", neighborhoods["display_name"])
 start_row = neighborhoods[neighborhoods["display_name"] == start_name].iloc[0]
 
-start_node = find_nearest_road_node(start_row["x"], start_row["y"], roads)
-school_node = find_nearest_road_node(SCHOOL_X, SCHOOL_Y, roads)
+start_node = find_nearest_road_node(start_row["x"], start_row["y"])
+school_node = find_nearest_road_node(SCHOOL_X, SCHOOL_Y)
 
 # ============================
 # Build routing graph
@@ -292,8 +294,7 @@ for _, road in roads.iterrows():
         "distance_to_school_m": abs(road["to_x"] - SCHOOL_X) * 100
     }
 
-    X = pd.get_dummies(pd.DataFrame([features]))
-    X = X.reindex(columns=automl.feature_names_in_, fill_value=0)
+    X = encoder.transform_frame(features)
 
     speed = max(5.0, automl.predict(X)[0])
     travel_time = ROAD_DISTANCE_KM / speed
@@ -5,6 +5,9 @@ import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
 
+from feature_encoder import load_encoder
+from routing import build_road_node_lookup, node_coords, snap_to_nodes
+
 # ============================
 # App title
 # ============================
@@ -17,6 +20,8 @@ st.subheader("AI-powered school route optimization")
 with open("safeflow_speed_model.pkl", "rb") as f:
     automl = pickle.load(f)
 
+encoder = load_encoder("safeflow_speed_model.pkl", automl)
+
 # ============================
 # Load city data
 # ============================
@@ -98,18 +103,11 @@ def draw_city(grid, path=None):
 # ============================
 # Helper: snap to nearest road
 # ============================
-def find_nearest_road_node(nx0, ny0, roads_df):
-    min_dist = float("inf")
-    nearest = None
-
-    for _, r in roads_df.iterrows():
-        for x, y in [(r["from_x"], r["from_y"]), (r["to_x"], r["to_y"])]:
-            d = abs(nx0 - x) + abs(ny0 - y)
-            if d < min_dist:
-                min_dist = d
-                nearest = (x, y)
+nearest_road = build_road_node_lookup(roads, GRID_SIZE)
 
-    return f"({nearest[0]},{nearest[1]})"
+def find_nearest_road_node(nx0, ny0):
+    x, y = node_coords(snap_to_nodes(nearest_road, nx0, ny0), GRID_SIZE)
+    return f"({x},{y})"
 
 # ============================
 # User inputs
@@ -124,8 +122,8 @@ start_neighborhood_id = st.selectbox(
 )
 
 start_row = neighborhoods[neighborhoods["neighborhood_id"] == start_neighborhood_id].iloc[0]
-start_node = find_nearest_road_node(start_row["x"], start_row["y"], roads)
-school_node = find_nearest_road_node(18, 18, roads)
+start_node = find_nearest_road_node(start_row["x"], start_row["y"])
+school_node = find_nearest_road_node(18, 18)
 
 # ============================
 # Build routing graph
@@ -152,9 +150,7 @@ for _, road in roads.iterrows():
         "distance_to_school_m": abs(road["to_x"] - 18) * 100
     }
 
-    X = pd.DataFrame([features])
-    X = pd.get_dummies(X)
-    X = X.reindex(columns=automl.feature_names_in_, fill_value=0)
+    X = encoder.transform_frame(features)
 
     speed = max(5.0, automl.predict(X)[0])
     travel_time = ROAD_DISTANCE_KM / speed
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import pickle
+import time
+
+import pandas as pd
+from flaml import AutoML
+from sklearn.model_selection import train_test_split
+
+from dataset_io import load_dataset
+from feature_encoder import DROP_COLS, FeatureEncoder
+from generate_data import NUM_NEIGHBORHOODS, generate_scaled
+from model_latency import measure_latency
+
+# ============================
+# Training benchmark
+# ============================
+# Sweeps datasets x estimator subsets x time budgets, trains one FLAML
+# search per combination on the same split and appends one JSON record
+# per run to the results file:
+#   test metric (RMSE for the speed model, accuracy for the classifiers),
+#   fit time, pickled model size, single-row and batch predict latency.
+# The summary table is printed from the results file, so earlier sweeps
+# can be compared with --summary alone.
+RESULTS_PATH = "benchmark_results.jsonl"
+SCALED_DIR = "bench_data"
+DATA_PATH = "safeflow_ai_simulated_dataset.csv"
+
+BUDGETS = [10, 30, 120]
+ESTIMATOR_SETS = ["lgbm", "rf", "xgboost", "lgbm,rf,xgboost"]
+BATCH_ROWS = 1000
+SEED = 42
+
+# Target -> (task, metric); the speed model is train_automl.py, the two
+# classifiers are train_automlold.py
+TARGETS = {
+    "average_speed": ("regression", "rmse"),
+    "congestion_level": ("classification", "accuracy"),
+    "accident_risk": ("classification", "accuracy")
+}
+
+
+# ----------------------------
+# Datasets
+# ----------------------------
+def scaled_dataset(num_roads, days=1):
+    # generate_data.py scalable mode, generated once per size
+    path = os.path.join(SCALED_DIR, f"roads-{num_roads}-days-{days}.parquet")
+    if not os.path.exists(path):
+        os.makedirs(SCALED_DIR, exist_ok=True)
+        print(f"Generating {path}")
+        generate_scaled(path, num_roads, max(NUM_NEIGHBORHOODS, num_roads // 10), days)
+    return path
+
+
+def prepare(path, target):
+    df = load_dataset(path)
+    encoder = FeatureEncoder.fit(df, drop=DROP_COLS)
+    X = encoder.transform_frame(df)
+    y = df[target]
+    if TARGETS[target][0] == "classification":
+        y = y.astype(str)
+
+    return train_test_split(
+        X, y,
+        test_size=0.2,
+        random_state=SEED,
+        stratify=y if TARGETS[target][0] == "classification" else None
+    )
+
+
+# ----------------------------
+# One run
+# ----------------------------
+def score(model, X_test, y_test, metric):
+    preds = model.predict(X_test)
+    if metric == "rmse":
+        return float(((preds - y_test.to_numpy()) ** 2).mean() ** 0.5)
+    return float((preds == y_test.to_numpy()).mean())
+
+
+def run_one(split, target, estimators, budget):
+    X_train, X_test, y_train, y_test = split
+    task, metric = TARGETS[target]
+
+    automl = AutoML()
+    start = time.perf_counter()
+    automl.fit(
+        X_train,
+        y_train,
+        task=task,
+        time_budget=budget,
+        metric=metric,
+        estimator_list=estimators,
+        seed=SEED,
+        verbose=0
+    )
+    fit_seconds = time.perf_counter() - start
+
+    return {
+        "best_estimator": automl.best_estimator,
+        "fit_seconds": round(fit_seconds, 2),
+        "metric": metric,
+        "score": score(automl, X_test, y_test, metric),
+        "model_bytes": len(pickle.dumps(automl)),
+        **measure_latency(automl, X_test.iloc[:BATCH_ROWS])
+    }
+
+
+# ----------------------------
+# Summary
+# ----------------------------
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with open(path) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def summarize(results, bar=None):
+    columns = [
+        "dataset", "rows", "target", "estimators", "time_budget", "best_estimator",
+        "score", "fit_seconds", "model_bytes", "row_ms", "batch_ms"
+    ]
+    table = results[columns].copy()
+    table["model_kb"] = (table.pop("model_bytes") / 1024).round(1)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    if bar is None:
+        return
+    # Cheapest = lowest batch latency, then lowest training budget, among
+    # the runs that meet the accuracy bar (RMSE <= bar / accuracy >= bar)
+    for (dataset, target), runs in results.groupby(["dataset", "target"]):
+        ok = runs[runs["score"] <= bar] if runs["metric"].iloc[0] == "rmse" else runs[runs["score"] >= bar]
+        if ok.empty:
+            print(f"\n{dataset} / {target}: no run meets {bar}")
+            continue
+        best = ok.sort_values(["batch_ms", "time_budget"]).iloc[0]
+        print(
+            f"\n{dataset} / {target}: cheapest meeting {bar}: {best['estimators']} @ {best['time_budget']}s "
+            f"-> {best['best_estimator']}, {best['metric']} {best['score']:.3f}, "
+            f"{best['row_ms']:.2f} ms/row, {best['batch_ms']:.1f} ms/{best['batch_rows']} rows"
+        )
+
+
+# ============================
+# CLI
+# ============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark AutoML time budgets and estimator subsets")
+    parser.add_argument("--data", nargs="*", default=[DATA_PATH], help="dataset paths (CSV, Parquet or directory)")
+    parser.add_argument("--roads", type=int, nargs="*", default=[],
+                        help="also benchmark generated datasets with this many roads (one day each)")
+    parser.add_argument("--target", choices=list(TARGETS), default="average_speed")
+    parser.add_argument("--budgets", type=int, nargs="+", default=BUDGETS, help="seconds per search")
+    parser.add_argument("--estimators", nargs="+", default=ESTIMATOR_SETS,
+                        help="estimator subsets, comma separated (e.g. lgbm rf lgbm,rf)")
+    parser.add_argument("--results", default=RESULTS_PATH)
+    parser.add_argument("--bar", type=float, default=None,
+                        help="accuracy bar: max RMSE (regression) or min accuracy (classification)")
+    parser.add_argument("--summary", action="store_true", help="only print the summary of existing results")
+    args = parser.parse_args()
+
+    if not args.summary:
+        datasets = list(args.data) + [scaled_dataset(n) for n in args.roads]
+        started = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        for path in datasets:
+            split = prepare(path, args.target)
+            rows = len(split[0]) + len(split[1])
+
+            for estimators in args.estimators:
+                for budget in args.budgets:
+                    print(f"{os.path.basename(path)} ({rows:,} rows) | {estimators} | {budget}s")
+                    record = {
+                        "sweep": started,
+                        "dataset": os.path.basename(os.path.normpath(path)),
+                        "rows": rows,
+                        "target": args.target,
+                        "estimators": estimators,
+                        "time_budget": budget,
+                        **run_one(split, args.target, estimators.split(","), budget)
+                    }
+                    with open(args.results, "a") as f:
+                        f.write(json.dumps(record) + "\n")
+
+    results = load_results(args.results)
+    if results.empty:
+        print(f"No results in {args.results}")
+    else:
+        summarize(results[results["target"] == args.target], args.bar)
@@ -0,0 +1,89 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgb
+from matplotlib.figure import Figure
+
+# ============================
+# Raster settings
+# ============================
+BASE_MAP_MAX_PX = 1600       # longest side of the cached base image
+CELL_PX_MAX = 40             # never upscale a cell beyond this
+GRID_LINE_MIN_CELL_PX = 8    # white cell borders only when they are visible
+LABEL_MAX_GRID_SIZE = 40     # letter labels stop being readable past this
+
+
+# ============================
+# Base map (static city as one image)
+# ============================
+def cell_palette(color_map, default_color="#f5f5f5"):
+    num_codes = max(color_map) + 1
+    palette = np.array([to_rgb(default_color)] * 256)
+    for code in range(num_codes):
+        palette[code] = to_rgb(color_map.get(code, default_color))
+    return (palette * 255).astype(np.uint8)
+
+
+def render_base_map(grid, color_map, label_map=None):
+    grid = np.asarray(grid, dtype=np.uint8)
+    grid_size = grid.shape[0]
+
+    cell_px = max(1, min(CELL_PX_MAX, BASE_MAP_MAX_PX // grid_size))
+    image = cell_palette(color_map)[grid]
+
+    if cell_px > 1:
+        image = np.repeat(np.repeat(image, cell_px, axis=0), cell_px, axis=1)
+
+    if cell_px >= GRID_LINE_MIN_CELL_PX:
+        image[::cell_px, :] = 255
+        image[:, ::cell_px] = 255
+
+    if not label_map or grid_size > LABEL_MAX_GRID_SIZE:
+        return image
+
+    # Bake the cell letters into the image once so later figures only
+    # need a single imshow
+    height, width = image.shape[:2]
+    dpi = 100
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.imshow(image, extent=(0, grid_size, 0, grid_size), interpolation="nearest")
+    ax.set_xlim(0, grid_size)
+    ax.set_ylim(0, grid_size)
+    ax.axis("off")
+
+    fontsize = 0.45 * cell_px * 72 / dpi
+    ys, xs = np.nonzero(np.isin(grid, list(label_map)))
+    for x, y in zip(xs, ys):
+        ax.text(
+            x + 0.5,
+            grid_size - y - 0.5,
+            label_map[grid[y, x]],
+            ha="center",
+            va="center",
+            fontsize=fontsize,
+            fontweight="bold"
+        )
+
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba())[..., :3].copy()
+
+
+# ============================
+# Route overlay
+# ============================
+def draw_route_map(base_image, grid_size, xs=None, ys=None, figsize=(7.5, 7.5)):
+    fig, ax = plt.subplots(figsize=figsize)
+
+    ax.imshow(base_image, extent=(0, grid_size, 0, grid_size), interpolation="nearest")
+
+    if xs is not None:
+        ax.plot(np.asarray(xs) + 0.5, grid_size - np.asarray(ys) - 0.5, color="red", linewidth=3)
+
+    ax.set_xlim(0, grid_size)
+    ax.set_ylim(0, grid_size)
+    ax.set_xticks([])
+    ax.set_yticks([])
+
+    return fig, ax
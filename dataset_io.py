@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from road_speeds import file_sha256
+
+# ============================
+# Dataset schema
+# ============================
+# Repeated strings are stored as dictionary-encoded categoricals and
+# flags / small counts as narrow ints. Parquet files written here use
+# this schema, and read_dataset returns these dtypes for CSV input too.
+LEVEL_CATEGORIES = ["LOW", "MEDIUM", "HIGH"]
+
+
+def category(index_type=pa.int8()):
+    return pa.dictionary(index_type, pa.string())
+
+
+DATASET_SCHEMA = pa.schema([
+    ("hour", pa.int8()),
+    ("day_of_week", pa.int8()),
+    ("is_school_day", pa.int8()),
+    ("is_arrival_time", pa.int8()),
+    ("is_dismissal_time", pa.int8()),
+    ("weather_condition", category()),
+    ("precipitation", pa.int8()),
+    ("visibility_level", category()),
+    ("road_id", category(pa.int32())),
+    ("start_node", category(pa.int32())),
+    ("end_node", category(pa.int32())),
+    ("num_lanes", pa.int8()),
+    ("speed_limit", pa.int8()),
+    ("distance_km", pa.float32()),
+    ("is_intersection", pa.int8()),
+    ("neighborhood_id", category(pa.int32())),
+    ("neighborhood_population", pa.int32()),
+    ("working_population_pct", pa.float32()),
+    ("students_population", pa.int16()),
+    ("distance_to_school_m", pa.int32()),
+    ("crosswalk_present", pa.int8()),
+    ("crossing_guard_present", pa.int8()),
+    ("traffic_volume", pa.int16()),
+    ("average_speed", pa.float32()),
+    ("congestion_level", category()),
+    ("accident_risk", category())
+])
+
+# Categoricals with a fixed category order (the rest keep what the data has)
+FIXED_CATEGORIES = {
+    "congestion_level": LEVEL_CATEGORIES,
+    "accident_risk": LEVEL_CATEGORIES
+}
+
+# CSV is parsed straight into the narrow types; dictionaries are applied after
+CSV_COLUMN_TYPES = {
+    field.name: pa.string() if pa.types.is_dictionary(field.type) else field.type
+    for field in DATASET_SCHEMA
+}
+
+
+def to_schema_table(data):
+    # Casts known columns to DATASET_SCHEMA; unknown columns pass through.
+    # Casts are safe, so an out-of-range value raises instead of wrapping.
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    for i, name in enumerate(table.column_names):
+        j = DATASET_SCHEMA.get_field_index(name)
+        if j >= 0 and table.schema.field(i).type != DATASET_SCHEMA.field(j).type:
+            table = table.set_column(i, DATASET_SCHEMA.field(j), table.column(i).cast(DATASET_SCHEMA.field(j).type))
+    return table
+
+
+def apply_fixed_categories(df):
+    for column, categories in FIXED_CATEGORIES.items():
+        if column in df.columns:
+            df[column] = df[column].astype(pd.CategoricalDtype(categories))
+    return df
+
+# ============================
+# Simulated dataset storage
+# ============================
+# Generators hand over one chunk (a time window) at a time; the writer
+# appends it to the chosen target so nothing accumulates in memory:
+#   *.csv      -> one CSV, header written once
+#   *.parquet  -> one Parquet file, one row group per chunk
+#   directory  -> hive-partitioned Parquet, day_of_week=<d>/hour=<h>/
+#                 so readers can prune partitions without opening files
+#                 (the partition columns are also kept inside each file)
+PARTITION_COLUMNS = ["day_of_week", "hour"]
+PARTITION_SCHEMA = pa.schema([("day_of_week", pa.int8()), ("hour", pa.int8())])
+
+
+def storage_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    return "partitioned"
+
+
+def partition_dir(root, day, hour):
+    return os.path.join(root, f"day_of_week={int(day)}", f"hour={int(hour)}")
+
+
+class DatasetWriter:
+    def __init__(self, path):
+        self.path = path
+        self.fmt = storage_format(path)
+        self.parquet_writer = None
+        self.rows = 0
+
+        if self.fmt == "partitioned":
+            os.makedirs(path, exist_ok=True)
+
+    def write(self, df, part_name="part-0"):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        elif self.fmt == "parquet":
+            table = to_schema_table(df)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            # DATASET_SCHEMA already stores the partition columns as int8
+            table = to_schema_table(df)
+            keys = table.select(PARTITION_COLUMNS).group_by(PARTITION_COLUMNS).aggregate([])
+            for day, hour in zip(keys["day_of_week"].to_pylist(), keys["hour"].to_pylist()):
+                part = table
+                if keys.num_rows > 1:
+                    part = table.filter((ds.field("day_of_week") == day) & (ds.field("hour") == hour))
+
+                target = partition_dir(self.path, day, hour)
+                os.makedirs(target, exist_ok=True)
+                pq.write_table(part, os.path.join(target, f"{part_name}.parquet"))
+
+        self.rows += len(df)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================
+# Reading
+# ============================
+def open_dataset(path):
+    fmt = storage_format(path)
+    if fmt == "partitioned":
+        return ds.dataset(path, format="parquet", partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"))
+    if fmt == "csv":
+        csv_format = ds.CsvFileFormat(convert_options=pacsv.ConvertOptions(column_types=CSV_COLUMN_TYPES))
+        return ds.dataset(path, format=csv_format)
+    return ds.dataset(path, format="parquet")
+
+
+def read_csv_table(path, columns=None):
+    # Multithreaded Arrow CSV parser, straight into the schema types
+    table = pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=pacsv.ConvertOptions(column_types=CSV_COLUMN_TYPES, include_columns=columns)
+    )
+    return to_schema_table(table)
+
+
+def read_dataset(path, columns=None, filter=None):
+    # filter is a pyarrow expression, e.g. ds.field("hour").isin([7, 8]);
+    # on a partitioned directory it skips non-matching partitions entirely
+    if storage_format(path) == "csv" and filter is None:
+        table = read_csv_table(path, columns)
+    else:
+        table = to_schema_table(open_dataset(path).to_table(columns=columns, filter=filter))
+    return apply_fixed_categories(table.to_pandas())
+
+
+# ============================
+# Shared loader: path resolution + Parquet cache for CSV
+# ============================
+# Relative paths are tried against the working directory, this project
+# directory and its Data/ folder, so training scripts work from anywhere.
+# A CSV is parsed once and cached next to it as <name>.cache.parquet; the
+# cache records the CSV's size, mtime and sha256 and is rebuilt when
+# they no longer match (a touched but unchanged CSV keeps its cache).
+DATASET_NAME = "safeflow_ai_simulated_dataset.csv"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_SUFFIX = ".cache.parquet"
+CACHE_META_KEY = b"safeflow_source"
+
+
+def resolve_dataset_path(path=DATASET_NAME):
+    if os.path.isabs(path):
+        candidates = [path]
+    else:
+        search_dirs = [os.getcwd(), BASE_DIR, os.path.join(BASE_DIR, "Data")]
+        candidates = [os.path.join(d, path) for d in search_dirs]
+        candidates.append(os.path.join(BASE_DIR, "Data", os.path.basename(path)))
+
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return os.path.abspath(candidate)
+    raise FileNotFoundError(f"Dataset '{path}' not found; tried: {', '.join(candidates)}")
+
+
+def cache_path(csv_path):
+    return os.path.splitext(csv_path)[0] + CACHE_SUFFIX
+
+
+def _source_key(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _cached_table(csv_path, columns):
+    path = cache_path(csv_path)
+    if not os.path.exists(path):
+        return None
+
+    meta = pq.read_schema(path).metadata or {}
+    if CACHE_META_KEY not in meta:
+        return None
+    cached = json.loads(meta[CACHE_META_KEY])
+
+    key = _source_key(csv_path)
+    if key["size"] != cached["size"]:
+        return None
+    if key["mtime_ns"] != cached["mtime_ns"] and file_sha256(csv_path) != cached["sha256"]:
+        return None
+    return pq.read_table(path, columns=columns)
+
+
+def _write_cache(csv_path, table):
+    source = dict(_source_key(csv_path), sha256=file_sha256(csv_path))
+    metadata = dict(table.schema.metadata or {})
+    metadata[CACHE_META_KEY] = json.dumps(source).encode()
+
+    path = cache_path(csv_path)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        pq.write_table(table.replace_schema_metadata(metadata), tmp)
+        os.replace(tmp, path)
+    except OSError as e:
+        # A read-only data directory just means no cache
+        print(f"Dataset cache not written ({e})", file=sys.stderr)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load_dataset(path=DATASET_NAME, columns=None, cache=True):
+    path = resolve_dataset_path(path)
+    if storage_format(path) != "csv" or not cache:
+        return read_dataset(path, columns)
+
+    table = _cached_table(path, columns)
+    if table is None:
+        table = read_csv_table(path)
+        _write_cache(path, table)
+        if columns is not None:
+            table = table.select(columns)
+    return apply_fixed_categories(table.to_pandas())
+
+
+# ============================
+# CLI: convert a dataset to typed Parquet
+# ============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a SafeFlow dataset to typed Parquet")
+    parser.add_argument("input", help="CSV, Parquet or partitioned directory")
+    parser.add_argument("output", help="*.parquet file or a directory (partitioned)")
+    args = parser.parse_args()
+
+    df = read_dataset(args.input)
+    with DatasetWriter(args.output) as writer:
+        writer.write(df)
+
+    def disk_size(path):
+        if os.path.isdir(path):
+            return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+        return os.path.getsize(path)
+
+    print(f"Rows: {len(df):,}")
+    print(f"On disk: {disk_size(args.input) / 1e6:.2f} MB -> {disk_size(args.output) / 1e6:.2f} MB")
+    print(f"In memory: {df.memory_usage(deep=True).sum() / 1e6:.2f} MB")
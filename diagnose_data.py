@@ -1,12 +1,35 @@
 print("DIAGNOSTIC SCRIPT IS RUNNING")
 
+import os
+
 import joblib
-import pandas as pd
 
-print("Loading preprocessor...")
-preprocessor = joblib.load("preprocessor.pkl")
+from feature_encoder import encoder_path, load_encoder
+
+# Feature layout each saved model expects: its *.encoder.json when
+# present, else the layout the model was fitted on
+MODELS = ["safeflow_speed_model.pkl", "congestion_model.pkl", "accident_model.pkl"]
+
+for model_path in MODELS:
+    if not os.path.exists(model_path):
+        print(f"{model_path}: not found")
+        continue
+
+    print(f"Loading {model_path}...")
+    model = joblib.load(model_path)
+    names = getattr(model, "feature_names_in_", None)
+    unnamed = names is None or all(str(name).startswith("Column_") for name in names)
+    if not os.path.exists(encoder_path(model_path)) and unnamed:
+        # Fitted on an unnamed array (before the shared encoder; LightGBM
+        # then makes up Column_0, Column_1, ...). A retrain with
+        # train_automlold.py writes the encoder next to the model.
+        print(f"{model_path}: no saved feature layout, retrain to create {encoder_path(model_path)}")
+        continue
+
+    encoder = load_encoder(model_path, model)
+    source = encoder_path(model_path) if os.path.exists(encoder_path(model_path)) else "model layout"
 
-print("Preprocessor expects columns:")
-print(preprocessor.feature_names_in_)
+    print(f"{model_path} expects {encoder.n_features} columns ({source}):")
+    print(encoder.feature_names)
 
 print("DONE")
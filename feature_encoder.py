@@ -0,0 +1,174 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# ============================
+# Shared feature encoder
+# ============================
+# One fitted object with a fixed column layout, used by training and by
+# every serving path. It writes straight into a float64 matrix: numeric
+# inputs are copied to their column, categorical inputs set a 1 in the
+# column of their value (the same columns pd.get_dummies would make).
+# Inputs the layout doesn't know are ignored; layout columns missing from
+# the input and unseen category values stay 0, like the old
+# get_dummies(...).reindex(columns=..., fill_value=0).
+CATEGORICAL_COLUMNS = ["weather_condition", "visibility_level"]
+
+# Same columns train_automl.py drops before encoding (targets and IDs)
+DROP_COLS = [
+    "average_speed",
+    "traffic_volume",
+    "congestion_level",
+    "accident_risk",
+    "road_id",
+    "start_node",
+    "end_node",
+    "neighborhood_id"
+]
+
+
+class FeatureEncoder:
+    def __init__(self, feature_names, categorical_columns=CATEGORICAL_COLUMNS):
+        self.feature_names = [str(name) for name in feature_names]
+        self.categorical_columns = list(categorical_columns)
+
+        # numeric: input column -> output index
+        # categories: input column -> {value: output index}
+        self.numeric = {}
+        self.categories = {}
+        for j, name in enumerate(self.feature_names):
+            column = next((c for c in self.categorical_columns if name.startswith(f"{c}_")), None)
+            if column is None:
+                self.numeric[name] = j
+            else:
+                self.categories.setdefault(column, {})[name[len(column) + 1:]] = j
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    # ----------------------------
+    # Fit: layout from a training frame
+    # ----------------------------
+    @classmethod
+    def fit(cls, df, drop=DROP_COLS):
+        # Same columns and order as pd.get_dummies(df.drop(columns=drop)):
+        # other columns first, then one column per category value
+        df = df.drop(columns=drop, errors="ignore")
+        categorical = [
+            c for c in df.columns
+            if isinstance(df[c].dtype, pd.CategoricalDtype) or df[c].dtype == object
+        ]
+
+        names = [c for c in df.columns if c not in categorical]
+        for column in categorical:
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                categories = list(values.cat.categories)
+            else:
+                categories = sorted(values.dropna().unique())
+            names.extend(f"{column}_{value}" for value in categories)
+
+        return cls(names, categorical)
+
+    # ----------------------------
+    # Transform: raw records / columns -> matrix
+    # ----------------------------
+    def transform(self, data, out=None):
+        # data: DataFrame, dict of columns (arrays or scalars) or a list of
+        # record dicts. out: optional preallocated (n, n_features) array.
+        if isinstance(data, list):
+            n = len(data)
+            needed = list(self.numeric) + list(self.categories)
+            data = {c: [record.get(c) for record in data] for c in needed if data and c in data[0]}
+        else:
+            n = _num_rows(data)
+        if out is None:
+            out = np.zeros((n, self.n_features), dtype=np.float64)
+        else:
+            out[:n] = 0
+
+        for column, j in self.numeric.items():
+            if column in data:
+                out[:n, j] = _values(data[column])
+
+        for column, mapping in self.categories.items():
+            if column not in data:
+                continue
+            values = data[column]
+
+            if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+                # Map category codes to output columns (-1 = not in layout)
+                lookup = np.array([mapping.get(str(c), -1) for c in values.cat.categories] + [-1])
+                cols = lookup[values.cat.codes.to_numpy()]
+                rows = np.flatnonzero(cols >= 0)
+                out[rows, cols[rows]] = 1
+            else:
+                values = _values(values)
+                for value, j in mapping.items():
+                    out[:n, j] = values == value
+
+        return out[:n]
+
+    def missing_columns(self, columns):
+        # Input columns the layout needs that are absent from columns
+        # (transform would leave their output columns at 0)
+        columns = set(columns)
+        return [c for c in list(self.numeric) + list(self.categories) if c not in columns]
+
+    def transform_frame(self, data):
+        # Same matrix with column names, for estimators fitted on a DataFrame
+        return pd.DataFrame(self.transform(data), columns=self.feature_names, copy=False)
+
+    # ----------------------------
+    # Persistence (JSON next to the model)
+    # ----------------------------
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"feature_names": self.feature_names, "categorical_columns": self.categorical_columns}, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            spec = json.load(f)
+        return cls(spec["feature_names"], spec["categorical_columns"])
+
+
+def _values(values):
+    if isinstance(values, pd.Series):
+        return values.to_numpy()
+    return np.asarray(values)
+
+
+def _num_rows(data):
+    if isinstance(data, pd.DataFrame):
+        return len(data)
+    for values in data.values():
+        if np.ndim(values) > 0:
+            return len(values)
+    return 1
+
+
+def encoder_path(model_path):
+    return os.path.splitext(model_path)[0] + ".encoder.json"
+
+
+@lru_cache(maxsize=8)
+def _encoder_for_names(feature_names):
+    return FeatureEncoder(feature_names)
+
+
+def encoder_for_model(model):
+    # The layout is the model's own feature_names_in_ (AutoML or lean model)
+    return _encoder_for_names(tuple(str(name) for name in model.feature_names_in_))
+
+
+def load_encoder(model_path, model=None):
+    # Saved encoder next to the model, else rebuilt from the model's layout
+    path = encoder_path(model_path)
+    if os.path.exists(path):
+        return FeatureEncoder.load(path)
+    return encoder_for_model(model)
@@ -1,13 +1,27 @@
+import argparse
+import os
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+
 import numpy as np
 import pandas as pd
 import random
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import breadth_first_order
+
+from dataset_io import DatasetWriter
+from generate_dataset import (
+    LEVELS, WEATHER_OPTIONS, VISIBILITY_OPTIONS,
+    weather_codes, congestion_codes, accident_risk_codes,
+    time_congestion_weight as vectorized_time_weight
+)
 
 # ----------------------------
 # Reproducibility
 # ----------------------------
 SEED = 42
-random.seed(SEED)
-np.random.seed(SEED)
 
 # ----------------------------
 # Global parameters
@@ -19,6 +33,8 @@ DAYS = 5                   # Monday–Friday
 TARGET_ROWS_APPROX = NUM_ROADS * TIME_WINDOWS_PER_DAY * DAYS  # ~4,800
 # We'll double via neighborhood variation to reach ~9,600
 
+OUTPUT_PATH = "/Users/ananyamadduri/Documents/Presidential_Challenge/Data/safeflow_ai_simulated_dataset.csv"
+
 # ----------------------------
 # School schedule
 # ----------------------------
@@ -26,35 +42,39 @@ SCHOOL_START = 8
 SCHOOL_END = 15
 
 # ----------------------------
-# Neighborhood definitions
+# Classic city (neighborhoods + road network)
 # ----------------------------
-neighborhoods = []
-for i in range(NUM_NEIGHBORHOODS):
-    neighborhoods.append({
-        "neighborhood_id": f"N{i}",
-        "neighborhood_population": random.randint(3000, 9000),
-        "working_population_pct": round(random.uniform(0.45, 0.7), 2),
-        "students_population": random.randint(400, 1200)
-    })
+# Seeds the global random / NumPy streams the classic generator draws
+# from, so it only runs when the classic dataset is generated, not on
+# import (benchmark_training.py imports the scalable helpers).
+def classic_city(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed)
 
-neighborhood_df = pd.DataFrame(neighborhoods)
+    neighborhoods = []
+    for i in range(NUM_NEIGHBORHOODS):
+        neighborhoods.append({
+            "neighborhood_id": f"N{i}",
+            "neighborhood_population": random.randint(3000, 9000),
+            "working_population_pct": round(random.uniform(0.45, 0.7), 2),
+            "students_population": random.randint(400, 1200)
+        })
 
-# ----------------------------
-# Road network
-# ----------------------------
-roads = []
-for i in range(NUM_ROADS):
-    roads.append({
-        "road_id": f"R{i}",
-        "start_node": random.choice(neighborhood_df["neighborhood_id"]),
-        "end_node": random.choice(neighborhood_df["neighborhood_id"].tolist() + ["SCHOOL"]),
-        "num_lanes": random.choice([1, 2, 3]),
-        "speed_limit": random.choice([25, 30, 35, 40]),
-        "distance_km": round(random.uniform(0.3, 3.0), 2),
-        "is_intersection": random.choice([0, 1])
-    })
+    neighborhood_df = pd.DataFrame(neighborhoods)
 
-roads_df = pd.DataFrame(roads)
+    roads = []
+    for i in range(NUM_ROADS):
+        roads.append({
+            "road_id": f"R{i}",
+            "start_node": random.choice(neighborhood_df["neighborhood_id"]),
+            "end_node": random.choice(neighborhood_df["neighborhood_id"].tolist() + ["SCHOOL"]),
+            "num_lanes": random.choice([1, 2, 3]),
+            "speed_limit": random.choice([25, 30, 35, 40]),
+            "distance_km": round(random.uniform(0.3, 3.0), 2),
+            "is_intersection": random.choice([0, 1])
+        })
+
+    return neighborhood_df, pd.DataFrame(roads)
 
 # ----------------------------
 # Weather generator
@@ -113,85 +133,302 @@ def accident_risk(congestion, precipitation, is_intersection, crossing_guard):
 # ----------------------------
 # Dataset generation
 # ----------------------------
-rows = []
-
-for day in range(DAYS):
-    for t in range(TIME_WINDOWS_PER_DAY):
-        hour = t // 2  # 30-minute bins
-
-        is_school_day = 1
-        is_arrival_time = 1 if 7 <= hour <= 9 else 0
-        is_dismissal_time = 1 if 14 <= hour <= 16 else 0
-
-        weather, precipitation, visibility = generate_weather()
-        time_weight = time_congestion_weight(hour)
-
-        for _, road in roads_df.iterrows():
-            # sample 2 neighborhoods per road-time to increase dataset size
-            for _ in range(2):
-                neighborhood = neighborhood_df.sample(1).iloc[0]
-
-                base_volume = (
-                    neighborhood["neighborhood_population"] *
-                    neighborhood["working_population_pct"]
-                )
-
-                traffic_volume = int(
-                    (base_volume / 120) * time_weight +
-                    random.randint(5, 20)
-                )
-
-                avg_speed = max(
-                    10,
-                    road["speed_limit"] - traffic_volume * 0.25
-                )
-
-                crosswalk_present = random.choice([0, 1])
-                crossing_guard_present = 1 if is_arrival_time or is_dismissal_time else 0
-
-                congestion = congestion_level(traffic_volume)
-                risk = accident_risk(
-                    congestion,
-                    precipitation,
-                    road["is_intersection"],
-                    crossing_guard_present
-                )
-
-                rows.append({
-                    "hour": hour,
-                    "day_of_week": day,
-                    "is_school_day": is_school_day,
-                    "is_arrival_time": is_arrival_time,
-                    "is_dismissal_time": is_dismissal_time,
-                    "weather_condition": weather,
-                    "precipitation": precipitation,
-                    "visibility_level": visibility,
-                    "road_id": road["road_id"],
-                    "start_node": road["start_node"],
-                    "end_node": road["end_node"],
-                    "num_lanes": road["num_lanes"],
-                    "speed_limit": road["speed_limit"],
-                    "distance_km": road["distance_km"],
-                    "is_intersection": road["is_intersection"],
-                    "neighborhood_id": neighborhood["neighborhood_id"],
-                    "neighborhood_population": neighborhood["neighborhood_population"],
-                    "working_population_pct": neighborhood["working_population_pct"],
-                    "students_population": neighborhood["students_population"],
-                    "distance_to_school_m": random.randint(100, 2000),
-                    "crosswalk_present": crosswalk_present,
-                    "crossing_guard_present": crossing_guard_present,
-                    "traffic_volume": traffic_volume,
-                    "average_speed": round(avg_speed, 1),
-                    "congestion_level": congestion,
-                    "accident_risk": risk
-                })
+# Rows are produced one time window at a time so the writer can stream
+# them out; the random stream is the same as generating everything at once.
+def iter_windows(neighborhood_df, roads_df, days=DAYS):
+    for day in range(days):
+        for t in range(TIME_WINDOWS_PER_DAY):
+            rows = []
+
+            hour = t // 2  # 30-minute bins
+
+            is_school_day = 1
+            is_arrival_time = 1 if 7 <= hour <= 9 else 0
+            is_dismissal_time = 1 if 14 <= hour <= 16 else 0
+
+            weather, precipitation, visibility = generate_weather()
+            time_weight = time_congestion_weight(hour)
+
+            for _, road in roads_df.iterrows():
+                # sample 2 neighborhoods per road-time to increase dataset size
+                for _ in range(2):
+                    neighborhood = neighborhood_df.sample(1).iloc[0]
+
+                    base_volume = (
+                        neighborhood["neighborhood_population"] *
+                        neighborhood["working_population_pct"]
+                    )
+
+                    traffic_volume = int(
+                        (base_volume / 120) * time_weight +
+                        random.randint(5, 20)
+                    )
+
+                    avg_speed = max(
+                        10,
+                        road["speed_limit"] - traffic_volume * 0.25
+                    )
+
+                    crosswalk_present = random.choice([0, 1])
+                    crossing_guard_present = 1 if is_arrival_time or is_dismissal_time else 0
+
+                    congestion = congestion_level(traffic_volume)
+                    risk = accident_risk(
+                        congestion,
+                        precipitation,
+                        road["is_intersection"],
+                        crossing_guard_present
+                    )
+
+                    rows.append({
+                        "hour": hour,
+                        "day_of_week": day,
+                        "is_school_day": is_school_day,
+                        "is_arrival_time": is_arrival_time,
+                        "is_dismissal_time": is_dismissal_time,
+                        "weather_condition": weather,
+                        "precipitation": precipitation,
+                        "visibility_level": visibility,
+                        "road_id": road["road_id"],
+                        "start_node": road["start_node"],
+                        "end_node": road["end_node"],
+                        "num_lanes": road["num_lanes"],
+                        "speed_limit": road["speed_limit"],
+                        "distance_km": road["distance_km"],
+                        "is_intersection": road["is_intersection"],
+                        "neighborhood_id": neighborhood["neighborhood_id"],
+                        "neighborhood_population": neighborhood["neighborhood_population"],
+                        "working_population_pct": neighborhood["working_population_pct"],
+                        "students_population": neighborhood["students_population"],
+                        "distance_to_school_m": random.randint(100, 2000),
+                        "crosswalk_present": crosswalk_present,
+                        "crossing_guard_present": crossing_guard_present,
+                        "traffic_volume": traffic_volume,
+                        "average_speed": round(avg_speed, 1),
+                        "congestion_level": congestion,
+                        "accident_risk": risk
+                    })
+
+            yield day, t, pd.DataFrame(rows)
+
+# ============================
+# Scalable topology mode (vectorized)
+# ============================
+# Same kind of abstract graph as above (roads between neighborhoods and
+# the school), sampled with NumPy so it scales to 100k+ roads and 10k+
+# neighborhoods. The first num_neighborhoods roads form a random tree
+# rooted at SCHOOL (each neighborhood links to one placed before it in a
+# random order), so every neighborhood can reach the school; the rest
+# get random endpoints like the classic generator.
+#
+# Stage memory: tracemalloc sees Python and NumPy allocations of the
+# stage but not Arrow / Parquet buffers, so the process peak RSS so far
+# (ru_maxrss, which covers everything but cannot be reset per stage) is
+# reported next to it.
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # KiB on Linux
+
+
+@contextmanager
+def stage(name, report):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss = peak_rss_mb()
+        report.append((name, seconds, peak / 1e6, rss))
+        print(f"[{name}] {seconds:.2f}s, Python peak {peak / 1e6:.1f} MB, process peak RSS {rss:.0f} MB")
+
+
+def build_neighborhoods(rng, num_neighborhoods):
+    return pd.DataFrame({
+        "neighborhood_id": [f"N{i}" for i in range(num_neighborhoods)],
+        "neighborhood_population": rng.integers(3000, 9001, size=num_neighborhoods, dtype=np.int32),
+        "working_population_pct": np.round(rng.uniform(0.45, 0.7, size=num_neighborhoods), 2),
+        "students_population": rng.integers(400, 1201, size=num_neighborhoods, dtype=np.int32)
+    })
+
+
+def build_roads(rng, num_roads, num_neighborhoods):
+    if num_roads < num_neighborhoods:
+        raise ValueError("Need at least one road per neighborhood to connect them all to the school")
+
+    # Node codes: 0..num_neighborhoods-1 are neighborhoods, num_neighborhoods is SCHOOL
+    school = num_neighborhoods
+
+    # Spanning tree: the i-th neighborhood in a random order links to the
+    # school or to one of the i neighborhoods placed before it
+    order = rng.permutation(num_neighborhoods)
+    placed = np.r_[school, order]
+    parent_pos = np.floor(rng.random(num_neighborhoods) * np.arange(1, num_neighborhoods + 1)).astype(np.int64)
+    tree_start, tree_end = order, placed[parent_pos]
+
+    extra = num_roads - num_neighborhoods
+    start = np.r_[tree_start, rng.integers(0, num_neighborhoods, size=extra)]
+    end = np.r_[tree_end, rng.integers(0, num_neighborhoods + 1, size=extra)]
+
+    shuffle = rng.permutation(num_roads)
+    start, end = start[shuffle], end[shuffle]
+
+    node_labels = np.array([f"N{i}" for i in range(num_neighborhoods)] + ["SCHOOL"])
+    return pd.DataFrame({
+        "road_id": [f"R{i}" for i in range(num_roads)],
+        "start_node": pd.Categorical.from_codes(start, categories=node_labels[:num_neighborhoods]),
+        "end_node": pd.Categorical.from_codes(end, categories=node_labels),
+        "num_lanes": rng.integers(1, 4, size=num_roads, dtype=np.int8),
+        "speed_limit": np.array([25, 30, 35, 40], dtype=np.int8)[rng.integers(0, 4, size=num_roads)],
+        "distance_km": np.round(rng.uniform(0.3, 3.0, size=num_roads), 2),
+        "is_intersection": rng.integers(0, 2, size=num_roads, dtype=np.int8)
+    })
+
+
+def unreachable_from_school(roads_df, num_neighborhoods):
+    n = num_neighborhoods + 1
+    start = roads_df["start_node"].cat.codes.to_numpy()
+    end = roads_df["end_node"].cat.codes.to_numpy()
+    graph = coo_matrix((np.ones(len(start), dtype=np.int8), (start, end)), shape=(n, n)).tocsr()
+    reached = breadth_first_order(graph, num_neighborhoods, directed=False, return_predecessors=False)
+    return n - len(reached)
+
+
+def generate_window_rows(rng, roads_df, neighborhood_df, day, t):
+    n_roads = len(roads_df)
+    n = 2 * n_roads   # 2 neighborhoods sampled per road-time, as above
+    road_idx = np.repeat(np.arange(n_roads), 2)
+
+    hour = t // 2
+    is_arrival_time = int(7 <= hour <= 9)
+    is_dismissal_time = int(14 <= hour <= 16)
+    crossing_guard_present = int(is_arrival_time or is_dismissal_time)
+    weather = int(weather_codes(rng, 1)[0])
+    precipitation = int(weather == 1)
+
+    nb_idx = rng.integers(0, len(neighborhood_df), size=n)
+    population = neighborhood_df["neighborhood_population"].to_numpy()
+    working_pct = neighborhood_df["working_population_pct"].to_numpy()
+
+    traffic_volume = np.floor(
+        (population[nb_idx] * working_pct[nb_idx] / 120) * vectorized_time_weight(hour)
+        + rng.integers(5, 21, size=n)
+    ).astype(np.int32)
+
+    speed_limit = roads_df["speed_limit"].to_numpy()[road_idx]
+    is_intersection = roads_df["is_intersection"].to_numpy()[road_idx]
+    congestion = congestion_codes(traffic_volume)
+    risk = accident_risk_codes(congestion, precipitation, is_intersection, crossing_guard_present)
+
+    def per_road(column):
+        values = roads_df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return pd.Categorical.from_codes(values.cat.codes.to_numpy()[road_idx], categories=values.cat.categories)
+        return values.to_numpy()[road_idx]
+
+    def constant(value, dtype=np.int8):
+        return np.full(n, value, dtype=dtype)
+
+    return pd.DataFrame({
+        "hour": constant(hour),
+        "day_of_week": constant(day),
+        "is_school_day": constant(1),
+        "is_arrival_time": constant(is_arrival_time),
+        "is_dismissal_time": constant(is_dismissal_time),
+        "weather_condition": pd.Categorical.from_codes(constant(weather), categories=WEATHER_OPTIONS),
+        "precipitation": constant(precipitation),
+        "visibility_level": pd.Categorical.from_codes(constant(int(weather != 0)), categories=VISIBILITY_OPTIONS),
+        "road_id": pd.Categorical.from_codes(road_idx, categories=roads_df["road_id"]),
+        "start_node": per_road("start_node"),
+        "end_node": per_road("end_node"),
+        "num_lanes": per_road("num_lanes"),
+        "speed_limit": speed_limit,
+        "distance_km": per_road("distance_km"),
+        "is_intersection": is_intersection,
+        "neighborhood_id": pd.Categorical.from_codes(nb_idx, categories=neighborhood_df["neighborhood_id"]),
+        "neighborhood_population": population[nb_idx],
+        "working_population_pct": working_pct[nb_idx],
+        "students_population": neighborhood_df["students_population"].to_numpy()[nb_idx],
+        "distance_to_school_m": rng.integers(100, 2001, size=n, dtype=np.int32),
+        "crosswalk_present": rng.integers(0, 2, size=n, dtype=np.int8),
+        "crossing_guard_present": constant(crossing_guard_present),
+        "traffic_volume": traffic_volume,
+        "average_speed": np.round(np.maximum(10, speed_limit - traffic_volume * 0.25), 1),
+        "congestion_level": pd.Categorical.from_codes(congestion, categories=LEVELS),
+        "accident_risk": pd.Categorical.from_codes(risk, categories=LEVELS)
+    })
+
+
+def generate_scaled(out_path, num_roads, num_neighborhoods, days=DAYS, seed=SEED, topology_dir=None):
+    # Returns [(stage, seconds, Python peak MB, process peak RSS MB), ...];
+    # the dataset is streamed
+    # to out_path one window at a time
+    report = []
+    root = np.random.SeedSequence(seed)
+    topology_rng = np.random.default_rng(root.spawn(1)[0])
+
+    with stage("neighborhoods", report):
+        neighborhood_df = build_neighborhoods(topology_rng, num_neighborhoods)
+
+    with stage("roads", report):
+        roads_df = build_roads(topology_rng, num_roads, num_neighborhoods)
+
+    with stage("connectivity", report):
+        unreachable = unreachable_from_school(roads_df, num_neighborhoods)
+        if unreachable:
+            raise RuntimeError(f"{unreachable} nodes cannot reach the school")
+
+    if topology_dir is not None:
+        with stage("save topology", report):
+            os.makedirs(topology_dir, exist_ok=True)
+            roads_df.to_parquet(os.path.join(topology_dir, "roads.parquet"), index=False)
+            neighborhood_df.to_parquet(os.path.join(topology_dir, "neighborhoods.parquet"), index=False)
+
+    with stage("dataset", report):
+        with DatasetWriter(out_path) as writer:
+            for day in range(days):
+                for t in range(TIME_WINDOWS_PER_DAY):
+                    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(day, t)))
+                    writer.write(generate_window_rows(rng, roads_df, neighborhood_df, day, t), part_name=f"window-{t:02d}")
+        print(f"Total rows: {writer.rows:,}")
+
+    return report
 
 # ----------------------------
 # Final dataset
 # ----------------------------
-df = pd.DataFrame(rows)
-df.to_csv("/Users/ananyamadduri/Documents/Presidential_Challenge/Data/safeflow_ai_simulated_dataset.csv", index=False)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the synthetic-topology SafeFlow dataset")
+    parser.add_argument(
+        "--out",
+        default=OUTPUT_PATH,
+        help="*.csv, *.parquet (one row group per window) or a directory (partitioned Parquet)"
+    )
+    parser.add_argument("--roads", type=int, default=None, help="scalable mode: number of roads (e.g. 100000)")
+    parser.add_argument("--neighborhoods", type=int, default=None, help="scalable mode: number of neighborhoods")
+    parser.add_argument("--days", type=int, default=DAYS, help="scalable mode only")
+    parser.add_argument("--topology-out", default=None, help="scalable mode: directory for roads/neighborhoods Parquet")
+    args = parser.parse_args()
+
+    if args.roads is not None or args.neighborhoods is not None:
+        num_roads = args.roads or NUM_ROADS
+        num_neighborhoods = args.neighborhoods or NUM_NEIGHBORHOODS
+        report = generate_scaled(args.out, num_roads, num_neighborhoods, args.days, SEED, args.topology_out)
+
+        print(f"\n{'stage':<15}{'seconds':>10}{'py peak MB':>12}{'RSS peak MB':>13}")
+        for name, seconds, peak, rss in report:
+            print(f"{name:<15}{seconds:>10.2f}{peak:>12.1f}{rss:>13.0f}")
+        print("py peak: Python/NumPy allocations within the stage (tracemalloc, misses Arrow buffers)")
+        print("RSS peak: whole process, highest so far")
+    else:
+        neighborhood_df, roads_df = classic_city()
+        with DatasetWriter(args.out) as writer:
+            for day, t, chunk in iter_windows(neighborhood_df, roads_df):
+                if writer.rows == 0:
+                    head = chunk.head()
+                writer.write(chunk, part_name=f"window-{t:02d}")
 
-print("Dataset generated successfully!")
-print(df.head())
-print(f"Total rows: {len(df)}")
\ No newline at end of file
+        print("Dataset generated successfully!")
+        print(head)
+        print(f"Total rows: {writer.rows}")
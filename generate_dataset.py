@@ -1,179 +1,512 @@
+import argparse
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
-import random
+from pandas.api.types import union_categoricals
+
+from dataset_io import DatasetWriter, storage_format
 
 # ----------------------------
 # Reproducibility
 # ----------------------------
 SEED = 42
-random.seed(SEED)
-np.random.seed(SEED)
-
-# ----------------------------
-# Load grid-derived structures
-# ----------------------------
-roads_df = pd.read_csv("roads_raw.csv")
-neighborhood_df = pd.read_csv("neighborhoods.csv")
 
 # ----------------------------
 # Global parameters
 # ----------------------------
 TIME_WINDOWS_PER_DAY = 48
 DAYS = 5
+SAMPLES_PER_ROAD = 2   # neighborhoods sampled per road-time (same as old)
 
 SCHOOL_X, SCHOOL_Y = 18, 18
 
+ROADS_PATH = "roads_raw.csv"
+NEIGHBORHOODS_PATH = "neighborhoods.csv"
+OUTPUT_PATH = "safeflow_ai_simulated_dataset.csv"
+
+WEATHER_OPTIONS = np.array(["clear", "rain", "fog"])
+WEATHER_WEIGHTS = [0.65, 0.25, 0.10]
+VISIBILITY_OPTIONS = np.array(["high", "low"])
+LEVELS = np.array(["LOW", "MEDIUM", "HIGH"])
+
+SPEED_CHOICES = np.array([25, 30, 35, 40])
+LANE_CHOICES = np.array([1, 2, 3])
+
 # ----------------------------
-# Weather generator (UNCHANGED)
+# Weather generator (vectorized)
 # ----------------------------
-def generate_weather():
-    weather = random.choices(
-        ["clear", "rain", "fog"],
-        weights=[0.65, 0.25, 0.10]
-    )[0]
-    precipitation = 1 if weather == "rain" else 0
-    visibility = "low" if weather in ["fog", "rain"] else "high"
+def weather_codes(rng, size):
+    return rng.choice(len(WEATHER_OPTIONS), size=size, p=WEATHER_WEIGHTS)
+
+
+def generate_weather(rng, size=None):
+    code = weather_codes(rng, size)
+    weather = WEATHER_OPTIONS[code]
+    precipitation = np.asarray(weather == "rain", dtype=np.int8)
+    visibility = np.where(weather == "clear", "high", "low")
     return weather, precipitation, visibility
 
 # ----------------------------
-# Time congestion weight (UNCHANGED)
+# Time congestion weight (vectorized)
 # ----------------------------
 def time_congestion_weight(hour):
-    if 7 <= hour <= 9:
-        return 1.8
-    elif 14 <= hour <= 16:
-        return 1.7
-    elif 6 <= hour <= 19:
-        return 1.2
-    else:
-        return 0.6
+    hour = np.asarray(hour)
+    return np.select(
+        [(7 <= hour) & (hour <= 9), (14 <= hour) & (hour <= 16), (6 <= hour) & (hour <= 19)],
+        [1.8, 1.7, 1.2],
+        0.6
+    )
 
 # ----------------------------
-# Congestion level logic (UNCHANGED)
+# Congestion level logic (vectorized)
 # ----------------------------
+# *_codes return indices into LEVELS (LOW / MEDIUM / HIGH); the label
+# versions are kept for callers that want the strings.
+def congestion_codes(traffic_volume):
+    traffic_volume = np.asarray(traffic_volume)
+    return np.select([traffic_volume < 40, traffic_volume < 75], [0, 1], 2).astype(np.int8)
+
+
 def congestion_level(traffic_volume):
-    if traffic_volume < 40:
-        return "LOW"
-    elif traffic_volume < 75:
-        return "MEDIUM"
-    else:
-        return "HIGH"
+    return LEVELS[congestion_codes(traffic_volume)]
 
 # ----------------------------
-# Accident risk logic (UNCHANGED)
+# Accident risk logic (vectorized)
 # ----------------------------
+def accident_risk_codes(congestion_code, precipitation, is_intersection, crossing_guard):
+    score = (
+        np.asarray(congestion_code, dtype=np.int16) + 1
+        + 2 * np.asarray(precipitation, dtype=np.int16)
+        + 2 * np.asarray(is_intersection, dtype=np.int16)
+        - np.asarray(crossing_guard, dtype=np.int16)
+    )
+    return np.select([score <= 3, score <= 6], [0, 1], 2).astype(np.int8)
+
+
 def accident_risk(congestion, precipitation, is_intersection, crossing_guard):
-    score = 0
-    score += {"LOW": 1, "MEDIUM": 2, "HIGH": 3}[congestion]
-    score += 2 if precipitation else 0
-    score += 2 if is_intersection else 0
-    score -= 1 if crossing_guard else 0
-
-    if score <= 3:
-        return "LOW"
-    elif score <= 6:
-        return "MEDIUM"
-    else:
-        return "HIGH"
+    congestion = np.asarray(congestion)
+    congestion_code = np.select([congestion == "LOW", congestion == "MEDIUM"], [0, 1], 2)
+    return LEVELS[accident_risk_codes(congestion_code, precipitation, is_intersection, crossing_guard)]
 
 # ----------------------------
 # Distance to school (GRID-AWARE)
 # ----------------------------
 def manhattan_distance(x1, y1, x2, y2):
-    return abs(x1 - x2) + abs(y1 - y2)
-
-# ----------------------------
-# Dataset generation
-# ----------------------------
-rows = []
-
-for day in range(DAYS):
-    for t in range(TIME_WINDOWS_PER_DAY):
-        hour = t // 2
-
-        is_school_day = 1
-        is_arrival_time = 1 if 7 <= hour <= 9 else 0
-        is_dismissal_time = 1 if 14 <= hour <= 16 else 0
-
-        weather, precipitation, visibility = generate_weather()
-        time_weight = time_congestion_weight(hour)
-
-        for _, road in roads_df.iterrows():
-
-            # sample 2 neighborhoods per road-time (same as old)
-            for _ in range(2):
-                neighborhood = neighborhood_df.sample(1).iloc[0]
-
-                base_volume = (
-                    neighborhood["neighborhood_population"] *
-                    neighborhood["working_population_pct"]
-                )
-
-                traffic_volume = int(
-                    (base_volume / 150) * time_weight +
-                    random.randint(5, 20)
-                )
-
-                avg_speed = max(
-                    10,
-                    random.choice([25, 30, 35, 40]) - traffic_volume * 0.25
-                )
-
-                crosswalk_present = random.choice([0, 1])
-                crossing_guard_present = 1 if (is_arrival_time or is_dismissal_time) else 0
-
-                congestion = congestion_level(traffic_volume)
-
-                # intersections = where road segments meet
-                is_intersection = random.choice([0, 1])
-
-                risk = accident_risk(
-                    congestion,
-                    precipitation,
-                    is_intersection,
-                    crossing_guard_present
-                )
-
-                dist_to_school = manhattan_distance(
-                    road["to_x"], road["to_y"],
-                    SCHOOL_X, SCHOOL_Y
-                ) * 100  # meters
-
-                rows.append({
-                    "hour": hour,
-                    "day_of_week": day,
-                    "is_school_day": is_school_day,
-                    "is_arrival_time": is_arrival_time,
-                    "is_dismissal_time": is_dismissal_time,
-                    "weather_condition": weather,
-                    "precipitation": precipitation,
-                    "visibility_level": visibility,
-                    "road_id": f"R{road['road_id']}",
-                    "start_node": f"({road['from_x']},{road['from_y']})",
-                    "end_node": f"({road['to_x']},{road['to_y']})",
-                    "num_lanes": random.choice([1, 2, 3]),
-                    "speed_limit": random.choice([25, 30, 35, 40]),
-                    "distance_km": round(0.1, 2),
-                    "is_intersection": is_intersection,
-                    "neighborhood_id": neighborhood["neighborhood_id"],
-                    "neighborhood_population": neighborhood["neighborhood_population"],
-                    "working_population_pct": neighborhood["working_population_pct"],
-                    "students_population": neighborhood["students_population"],
-                    "distance_to_school_m": dist_to_school,
-                    "crosswalk_present": crosswalk_present,
-                    "crossing_guard_present": crossing_guard_present,
-                    "traffic_volume": traffic_volume,
-                    "average_speed": round(avg_speed, 1),
-                    "congestion_level": congestion,
-                    "accident_risk": risk
-                })
+    return np.abs(np.asarray(x1) - x2) + np.abs(np.asarray(y1) - y2)
+
+# ----------------------------
+# Dataset generation (vectorized)
+# ----------------------------
+# Every column is produced as one array over the
+# day x window x road x sample cube, in the same row order as the old
+# nested loops (day, then window, then road, then sample).
+#
+# weather: precomputed weather codes per (day, window); drawn from rng
+#          when not given.
+# slots:   each road's slot in a block of `block_size` roads. Per-row
+#          draws are made for every slot of the block and the rows of the
+#          given roads picked out, so a road's rows depend only on its
+#          slot, not on which other roads are generated with it.
+def generate_rows(rng, roads_df, neighborhood_df, days=None, windows=None, weather=None, slots=None, block_size=None):
+    days = np.arange(DAYS) if days is None else np.asarray(days)
+    windows = np.arange(TIME_WINDOWS_PER_DAY) if windows is None else np.asarray(windows)
+
+    n_days, n_windows = len(days), len(windows)
+    n_roads, n_samples = len(roads_df), SAMPLES_PER_ROAD
+    per_window = n_roads * n_samples
+    n = n_days * n_windows * per_window
+
+    if slots is None:
+        slots, block_size = np.arange(n_roads), n_roads
+
+    # Positions of the generated rows inside the full block of draws
+    sample_slots = (np.asarray(slots)[:, None] * n_samples + np.arange(n_samples)).ravel()
+    rows_idx = (np.arange(n_days * n_windows)[:, None] * block_size * n_samples + sample_slots).ravel()
+    n_drawn = n_days * n_windows * block_size * n_samples
+
+    def draw(values):
+        return values if n_drawn == n else values[rows_idx]
+
+    # Per (day, window)
+    hour_w = np.tile(windows // 2, n_days)
+    weather_w = weather_codes(rng, n_days * n_windows) if weather is None else np.asarray(weather)
+    arrival_w = ((7 <= hour_w) & (hour_w <= 9)).astype(np.int8)
+    dismissal_w = ((14 <= hour_w) & (hour_w <= 16)).astype(np.int8)
+
+    def per_row(values):
+        return np.repeat(values, per_window)
+
+    hour = per_row(hour_w).astype(np.int8)
+    weather = per_row(weather_w)
+    precipitation = (weather == 1).astype(np.int8)
+    is_arrival_time = per_row(arrival_w)
+    is_dismissal_time = per_row(dismissal_w)
+    crossing_guard_present = is_arrival_time | is_dismissal_time
+    time_weight = per_row(time_congestion_weight(hour_w))
+
+    # Per road
+    road_idx = np.tile(np.repeat(np.arange(n_roads), n_samples), n_days * n_windows)
+    dist_to_school = manhattan_distance(
+        roads_df["to_x"].to_numpy(), roads_df["to_y"].to_numpy(),
+        SCHOOL_X, SCHOOL_Y
+    ) * 100  # meters
+
+    # Per row
+    nb_idx = draw(rng.integers(0, len(neighborhood_df), size=n_drawn))
+    population = neighborhood_df["neighborhood_population"].to_numpy()
+    working_pct = neighborhood_df["working_population_pct"].to_numpy()
+    students = neighborhood_df["students_population"].to_numpy()
+
+    base_volume = population[nb_idx] * working_pct[nb_idx]
+    traffic_volume = np.floor(
+        (base_volume / 150) * time_weight + draw(rng.integers(5, 21, size=n_drawn))
+    ).astype(np.int32)
+
+    avg_speed = np.maximum(10, SPEED_CHOICES[draw(rng.integers(0, 4, size=n_drawn))] - traffic_volume * 0.25)
+
+    crosswalk_present = draw(rng.integers(0, 2, size=n_drawn, dtype=np.int8))
+    is_intersection = draw(rng.integers(0, 2, size=n_drawn, dtype=np.int8))
+
+    congestion = congestion_codes(traffic_volume)
+    risk = accident_risk_codes(congestion, precipitation, is_intersection, crossing_guard_present)
+
+    # String columns become categoricals: one label per road / level,
+    # indexed by integer codes per row
+    def categorical(codes, labels):
+        return pd.Categorical.from_codes(codes, categories=labels)
+
+    def road_categorical(labels):
+        codes, uniques = pd.factorize(pd.Series(labels))
+        return categorical(codes[road_idx], uniques)
+
+    road_labels = [f"R{r}" for r in roads_df["road_id"]]
+    start_labels = [f"({x},{y})" for x, y in zip(roads_df["from_x"], roads_df["from_y"])]
+    end_labels = [f"({x},{y})" for x, y in zip(roads_df["to_x"], roads_df["to_y"])]
+
+    return pd.DataFrame({
+        "hour": hour,
+        "day_of_week": np.repeat(days, n_windows * per_window).astype(np.int8),
+        "is_school_day": np.ones(n, dtype=np.int8),
+        "is_arrival_time": is_arrival_time,
+        "is_dismissal_time": is_dismissal_time,
+        "weather_condition": categorical(weather, WEATHER_OPTIONS),
+        "precipitation": precipitation,
+        "visibility_level": categorical((weather != 0).astype(np.int8), VISIBILITY_OPTIONS),
+        "road_id": road_categorical(road_labels),
+        "start_node": road_categorical(start_labels),
+        "end_node": road_categorical(end_labels),
+        "num_lanes": LANE_CHOICES[draw(rng.integers(0, 3, size=n_drawn))].astype(np.int8),
+        "speed_limit": SPEED_CHOICES[draw(rng.integers(0, 4, size=n_drawn))].astype(np.int8),
+        "distance_km": np.full(n, 0.1),
+        "is_intersection": is_intersection,
+        "neighborhood_id": categorical(nb_idx, neighborhood_df["neighborhood_id"].to_numpy()),
+        "neighborhood_population": population[nb_idx],
+        "working_population_pct": working_pct[nb_idx],
+        "students_population": students[nb_idx],
+        "distance_to_school_m": dist_to_school[road_idx],
+        "crosswalk_present": crosswalk_present,
+        "crossing_guard_present": crossing_guard_present,
+        "traffic_volume": traffic_volume,
+        "average_speed": np.round(avg_speed, 1),
+        "congestion_level": categorical(congestion, LEVELS),
+        "accident_risk": categorical(risk, LEVELS)
+    })
+
+# ----------------------------
+# Partitioned generation (one time window at a time)
+# ----------------------------
+# Seeds are spawned from the root SeedSequence:
+#   weather of window t on day d -> spawn_key=(d, t)
+#   rows of a block of roads     -> spawn_key=(d, t, road_id // ROAD_BLOCK)
+# A road's rows therefore depend only on SEED, (day, window) and its
+# road_id; never on which process made them, what was generated before,
+# or which other roads exist. Output is the same for any worker count,
+# and new days or roads can be appended without touching existing rows.
+ROAD_BLOCK = 4096
+
+
+def partition_rng(day, t, seed=SEED, block=None):
+    key = (day, t) if block is None else (day, t, block)
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+
+
+def window_weather(day, t, seed=SEED):
+    return weather_codes(partition_rng(day, t, seed), 1)
+
+
+def generate_block(roads_df, neighborhood_df, day, t, seed=SEED):
+    # roads_df must hold roads of a single block
+    road_ids = roads_df["road_id"].to_numpy()
+    return generate_rows(
+        partition_rng(day, t, seed, block=int(road_ids[0]) // ROAD_BLOCK),
+        roads_df, neighborhood_df,
+        days=[day], windows=[t],
+        weather=window_weather(day, t, seed),
+        slots=road_ids % ROAD_BLOCK,
+        block_size=ROAD_BLOCK
+    )
+
+
+def concat_chunks(chunks):
+    # pd.concat turns categoricals with different categories into object
+    if len(chunks) == 1:
+        return chunks[0]
+    df = pd.concat(chunks, ignore_index=True)
+    for column, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            df[column] = union_categoricals([chunk[column] for chunk in chunks])
+    return df
+
+
+def generate_partition(roads_df, neighborhood_df, day, t, seed=SEED):
+    blocks = roads_df["road_id"].to_numpy() // ROAD_BLOCK
+    return concat_chunks([
+        generate_block(roads_df[blocks == block], neighborhood_df, day, t, seed)
+        for block in np.unique(blocks)
+    ])
+
+
+def partition_keys(days=DAYS):
+    return [(day, t) for day in range(days) for t in range(TIME_WINDOWS_PER_DAY)]
+
+
+def partition_name(t):
+    return f"window-{t:02d}"
+
+# ----------------------------
+# Partitioned store: one file per (day, window, run of road ids)
+# ----------------------------
+# Files are named window-<t>-roads-<lo>-<hi>.parquet and hold every road
+# with lo <= road_id < hi, which is how append mode finds what is missing.
+PART_PATTERN = re.compile(r"window-(\d+)-roads-(\d+)-(\d+)\.parquet$")
+
+# Part names don't record the seed, so the store keeps it in a manifest;
+# appending with another seed would mix two random streams. The leading
+# underscore keeps pyarrow's dataset discovery from reading it.
+STORE_MANIFEST = "_generator.json"
+
+
+def part_name(t, lo, hi):
+    return f"window-{t:02d}-roads-{lo:06d}-{hi:06d}"
+
+
+def part_files(root):
+    # (day, t, lo, hi, path) for every part file in the store
+    if not os.path.isdir(root):
+        return
+
+    for day_dir in os.listdir(root):
+        if not day_dir.startswith("day_of_week="):
+            continue
+        day = int(day_dir.split("=", 1)[1])
+        for hour_dir in os.listdir(os.path.join(root, day_dir)):
+            for name in os.listdir(os.path.join(root, day_dir, hour_dir)):
+                match = PART_PATTERN.match(name)
+                if match:
+                    t, lo, hi = map(int, match.groups())
+                    yield day, t, lo, hi, os.path.join(root, day_dir, hour_dir, name)
+
+
+def existing_parts(root):
+    # {(day, t): [(lo, hi), ...]} for the parts already on disk
+    covered = {}
+    for day, t, lo, hi, _ in part_files(root):
+        covered.setdefault((day, t), []).append((lo, hi))
+    return covered
+
+
+def clear_parts(root):
+    # A full regeneration replaces the store: part names carry the road
+    # range, so parts of another road set, seed or day count would
+    # otherwise stay next to the new ones. Only part files (and the
+    # directories they leave empty) are removed.
+    dirs = set()
+    for *_, path in list(part_files(root)):
+        os.remove(path)
+        dirs.add(os.path.dirname(path))
+
+    for hour_dir in dirs:
+        if not os.listdir(hour_dir):
+            os.rmdir(hour_dir)
+        day_dir = os.path.dirname(hour_dir)
+        if os.path.isdir(day_dir) and not os.listdir(day_dir):
+            os.rmdir(day_dir)
+
+
+def store_seed(root):
+    path = os.path.join(root, STORE_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)["seed"]
+
+
+def write_store_manifest(root, seed):
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, STORE_MANIFEST), "w") as f:
+        json.dump({"seed": seed}, f, indent=2)
+
+
+def check_append_seed(root, seed):
+    if not existing_parts(root):
+        return
+    stored = store_seed(root)
+    if stored is None:
+        raise ValueError(f"{root} has no {STORE_MANIFEST}, so its seed is unknown; regenerate it without --append")
+    if stored != seed:
+        raise ValueError(f"{root} was generated with seed {stored}; appending with seed {seed} would mix two streams")
+
+
+def road_runs(road_ids):
+    # Splits sorted road ids into runs of consecutive ids within one block
+    if len(road_ids) == 0:
+        return []
+    breaks = np.flatnonzero(
+        (np.diff(road_ids) != 1) | (np.diff(road_ids // ROAD_BLOCK) != 0)
+    ) + 1
+    return [(int(run[0]), int(run[-1]) + 1) for run in np.split(road_ids, breaks)]
+
+
+def missing_parts(root, roads_df, keys):
+    road_ids = np.sort(roads_df["road_id"].to_numpy())
+    covered = existing_parts(root)
+
+    parts = []
+    for day, t in keys:
+        missing = np.ones(len(road_ids), dtype=bool)
+        for lo, hi in covered.get((day, t), []):
+            missing &= (road_ids < lo) | (road_ids >= hi)
+        parts.extend((day, t, lo, hi) for lo, hi in road_runs(road_ids[missing]))
+    return parts
+
+
+def generate_part(roads_df, neighborhood_df, day, t, lo, hi, seed=SEED):
+    road_ids = roads_df["road_id"].to_numpy()
+    return generate_block(roads_df[(road_ids >= lo) & (road_ids < hi)], neighborhood_df, day, t, seed)
+
+
+# Worker processes receive the city tables once through the initializer
+_worker_roads = None
+_worker_neighborhoods = None
+
+
+def _init_worker(roads_df, neighborhood_df):
+    global _worker_roads, _worker_neighborhoods
+    _worker_roads, _worker_neighborhoods = roads_df, neighborhood_df
+
+
+def _partition_in_worker(day, t, seed):
+    return generate_partition(_worker_roads, _worker_neighborhoods, day, t, seed)
+
+
+def _part_in_worker(day, t, lo, hi, seed, out_path):
+    # Partitioned targets get one file per part, so workers write them directly
+    chunk = generate_part(_worker_roads, _worker_neighborhoods, day, t, lo, hi, seed)
+    DatasetWriter(out_path).write(chunk, part_name=part_name(t, lo, hi))
+    return len(chunk)
+
+
+def write_dataset(out_path, roads_df, neighborhood_df, keys, seed=SEED, workers=1, append=False):
+    # append: only generate the (day, window, road) parts missing from an
+    # existing partitioned store; the rest of the store is left as is
+    direct = storage_format(out_path) == "partitioned"
+    if append and not direct:
+        raise ValueError("Append mode needs a partitioned directory as output")
+
+    if direct:
+        if append:
+            check_append_seed(out_path, seed)
+            tasks = missing_parts(out_path, roads_df, keys)
+        else:
+            clear_parts(out_path)
+            road_ids = np.sort(roads_df["road_id"].to_numpy())
+            tasks = [(day, t, lo, hi) for day, t in keys for lo, hi in road_runs(road_ids)]
+        write_store_manifest(out_path, seed)
+    else:
+        tasks = keys
+
+    rows = 0
+    with DatasetWriter(out_path) as writer:
+        if workers <= 1:
+            for task in tasks:
+                if direct:
+                    day, t, lo, hi = task
+                    chunk = generate_part(roads_df, neighborhood_df, day, t, lo, hi, seed)
+                    writer.write(chunk, part_name=part_name(t, lo, hi))
+                else:
+                    day, t = task
+                    writer.write(generate_partition(roads_df, neighborhood_df, day, t, seed), part_name=partition_name(t))
+            return writer.rows
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(roads_df, neighborhood_df)
+        ) as pool:
+            pending = deque()
+            tasks = iter(tasks)
+
+            # Keep at most 2 * workers tasks in flight and consume them
+            # in order
+            while True:
+                while len(pending) < 2 * workers:
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    if direct:
+                        pending.append((task, pool.submit(_part_in_worker, *task, seed, out_path)))
+                    else:
+                        pending.append((task, pool.submit(_partition_in_worker, *task, seed)))
+
+                if not pending:
+                    break
+
+                task, future = pending.popleft()
+                if direct:
+                    rows += future.result()
+                else:
+                    writer.write(future.result(), part_name=partition_name(task[1]))
+
+        return rows if direct else writer.rows
 
 # ----------------------------
 # Save dataset
 # ----------------------------
-df = pd.DataFrame(rows)
-df.to_csv("safeflow_ai_simulated_dataset.csv", index=False)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the SafeFlow simulated dataset")
+    parser.add_argument(
+        "--out",
+        default=OUTPUT_PATH,
+        help="*.csv, *.parquet (one row group per window) or a directory (partitioned Parquet)"
+    )
+    parser.add_argument("--days", type=int, default=DAYS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--workers", type=int, default=1, help="processes generating partitions in parallel")
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="partitioned output only: generate just the (day, window, road) parts not already on disk"
+    )
+    args = parser.parse_args()
+
+    roads_df = pd.read_csv(ROADS_PATH)
+    neighborhood_df = pd.read_csv(NEIGHBORHOODS_PATH)
+
+    start = time.perf_counter()
+    rows = write_dataset(
+        args.out, roads_df, neighborhood_df,
+        partition_keys(args.days),
+        seed=args.seed,
+        workers=args.workers,
+        append=args.append
+    )
 
-print("Dataset generated successfully!")
-print(df.head())
-print(f"Total rows: {len(df)}")
+    print("Dataset generated successfully!")
+    print(generate_partition(roads_df, neighborhood_df, 0, 0, args.seed).head())
+    print(f"{'New' if args.append else 'Total'} rows: {rows} ({time.perf_counter() - start:.2f}s)")
@@ -1,82 +1,281 @@
+import argparse
+import os
 import random
+import time
+
+import numpy as np
 import pandas as pd
 
 GRID_SIZE = 20
-random.seed(42)
-
-BUILDING = "building"
-ROAD = "road"
-NEIGHBORHOOD = "neighborhood"
-SCHOOL = "school"
-
-grid = [[BUILDING for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-
-roads = []
-road_id = 0
-
-def add_horizontal_road(y, x_start, x_end, name):
-    global road_id
-    for x in range(x_start, x_end):
-        grid[y][x] = ROAD
-        grid[y][x + 1] = ROAD
-        roads.append({
-            "road_id": road_id,
-            "street_name": name,
-            "from_x": x,
-            "from_y": y,
-            "to_x": x + 1,
-            "to_y": y
-        })
-        road_id += 1
-
-def add_vertical_road(x, y_start, y_end, name):
-    global road_id
-    for y in range(y_start, y_end):
-        grid[y][x] = ROAD
-        grid[y + 1][x] = ROAD
-        roads.append({
-            "road_id": road_id,
-            "street_name": name,
-            "from_x": x,
-            "from_y": y,
-            "to_x": x,
-            "to_y": y + 1
+SEED = 42
+
+# Cell codes (grid is a uint8 array)
+BUILDING, ROAD, NEIGHBORHOOD, SCHOOL = range(4)
+CELL_NAMES = ["building", "road", "neighborhood", "school"]
+
+LOCAL, ARTERIAL = range(2)
+
+# ----------------------------
+# Street segments (columnar)
+# ----------------------------
+# A street is split into unit segments between neighbouring cells, the
+# same rows grid_generation has always written to roads_raw.csv, but
+# built as arrays instead of one dict per step.
+def street_segments(fixed, start, end, horizontal):
+    steps = np.arange(start, end, dtype=np.int32)
+    fixed = np.full(len(steps), fixed, dtype=np.int32)
+    if horizontal:
+        return steps, fixed, steps + 1, fixed
+    return fixed, steps, fixed, steps + 1
+
+
+class RoadNetwork:
+    def __init__(self, grid):
+        self.grid = grid
+        self.parts = []
+        self.street_names = []
+
+    def add_street(self, fixed, start, end, name, horizontal, road_class=LOCAL):
+        if end <= start:
+            return
+        fx, fy, tx, ty = street_segments(fixed, start, end, horizontal)
+        if horizontal:
+            self.grid[fixed, start:end + 1] = ROAD
+        else:
+            self.grid[start:end + 1, fixed] = ROAD
+
+        street_id = len(self.street_names)
+        self.street_names.append(name)
+        self.parts.append((fx, fy, tx, ty, np.full(len(fx), street_id, dtype=np.int32), road_class))
+
+    def add_horizontal_road(self, y, x_start, x_end, name, road_class=LOCAL):
+        self.add_street(y, x_start, x_end, name, True, road_class)
+
+    def add_vertical_road(self, x, y_start, y_end, name, road_class=LOCAL):
+        self.add_street(x, y_start, y_end, name, False, road_class)
+
+    def columns(self):
+        if not self.parts:
+            empty = np.zeros(0, dtype=np.int32)
+            return {"road_id": empty, "street_id": empty, "road_class": empty.astype(np.uint8),
+                    "from_x": empty, "from_y": empty, "to_x": empty, "to_y": empty}
+
+        street_id = np.concatenate([p[4] for p in self.parts])
+        return {
+            "road_id": np.arange(len(street_id), dtype=np.int32),
+            "street_id": street_id,
+            "road_class": np.concatenate([np.full(len(p[0]), p[5], dtype=np.uint8) for p in self.parts]),
+            "from_x": np.concatenate([p[0] for p in self.parts]),
+            "from_y": np.concatenate([p[1] for p in self.parts]),
+            "to_x": np.concatenate([p[2] for p in self.parts]),
+            "to_y": np.concatenate([p[3] for p in self.parts])
+        }
+
+# ----------------------------
+# Classic 20x20 city (roads_raw.csv / neighborhoods.csv)
+# ----------------------------
+def classic_city():
+    random.seed(SEED)
+
+    grid = np.full((GRID_SIZE, GRID_SIZE), BUILDING, dtype=np.uint8)
+    network = RoadNetwork(grid)
+
+    # Roads (non-uniform)
+    network.add_horizontal_road(4, 1, 18, "Maple Ave")
+    network.add_horizontal_road(9, 3, 16, "Oak St")
+    network.add_horizontal_road(14, 0, 12, "Pine Blvd")
+
+    network.add_vertical_road(3, 2, 17, "1st St")
+    network.add_vertical_road(7, 0, 14, "2nd St")
+    network.add_vertical_road(12, 5, 19, "3rd St")
+    network.add_vertical_road(17, 1, 10, "4th St")
+
+    # School
+    grid[18, 18] = SCHOOL
+    grid[18, 17] = ROAD
+
+    # Neighborhoods
+    neighborhood_positions = [(2,2), (6,6), (10,3), (5,15), (14,8), (9,17), (16,5)]
+
+    neighborhoods = []
+    for i, (x, y) in enumerate(neighborhood_positions):
+        grid[y, x] = NEIGHBORHOOD
+        neighborhoods.append({
+            "neighborhood_id": f"N{i}",
+            "neighborhood_population": random.randint(3000, 9000),
+            "working_population_pct": round(random.uniform(0.45, 0.7), 2),
+            "students_population": random.randint(400, 1200),
+            "x": x,
+            "y": y
         })
-        road_id += 1
-
-# Roads (non-uniform)
-add_horizontal_road(4, 1, 18, "Maple Ave")
-add_horizontal_road(9, 3, 16, "Oak St")
-add_horizontal_road(14, 0, 12, "Pine Blvd")
-
-add_vertical_road(3, 2, 17, "1st St")
-add_vertical_road(7, 0, 14, "2nd St")
-add_vertical_road(12, 5, 19, "3rd St")
-add_vertical_road(17, 1, 10, "4th St")
-
-# School
-grid[18][18] = SCHOOL
-grid[18][17] = ROAD
-
-# Neighborhoods
-neighborhood_positions = [(2,2), (6,6), (10,3), (5,15), (14,8), (9,17), (16,5)]
-
-neighborhoods = []
-for i, (x, y) in enumerate(neighborhood_positions):
-    grid[y][x] = NEIGHBORHOOD
-    neighborhoods.append({
-        "neighborhood_id": f"N{i}",
-        "neighborhood_population": random.randint(3000, 9000),
-        "working_population_pct": round(random.uniform(0.45, 0.7), 2),
-        "students_population": random.randint(400, 1200),
-        "x": x,
-        "y": y
+        grid[y, x + 1] = ROAD
+
+    schools = {"school_id": np.array(["S0"]), "x": np.array([18]), "y": np.array([18])}
+    return grid, network, pd.DataFrame(neighborhoods), pd.DataFrame(schools)
+
+# ----------------------------
+# Procedural city (large grids)
+# ----------------------------
+# Arterials cross the whole grid every ~arterial_spacing cells (with
+# jitter). Each block between arterials gets local streets every
+# ~local_spacing cells that run from arterial to arterial, so the network
+# stays connected; a fraction of local streets is dropped for variety.
+def street_lines(size, spacing, rng, jitter):
+    lines = np.arange(spacing // 2, size, spacing)
+    if jitter:
+        lines = lines + rng.integers(-jitter, jitter + 1, size=len(lines))
+    return np.unique(np.clip(lines, 0, size - 1))
+
+
+def procedural_city(
+    size,
+    seed=SEED,
+    arterial_spacing=20,
+    local_spacing=4,
+    local_drop_rate=0.15,
+    num_neighborhoods=None,
+    num_schools=None
+):
+    rng = np.random.default_rng(seed)
+    grid = np.full((size, size), BUILDING, dtype=np.uint8)
+    network = RoadNetwork(grid)
+
+    arterial_jitter = max(0, arterial_spacing // 5)
+    rows = street_lines(size, arterial_spacing, rng, arterial_jitter)
+    cols = street_lines(size, arterial_spacing, rng, arterial_jitter)
+
+    for k, y in enumerate(rows):
+        network.add_horizontal_road(int(y), 0, size - 1, f"Arterial Ave {k + 1}", ARTERIAL)
+    for k, x in enumerate(cols):
+        network.add_vertical_road(int(x), 0, size - 1, f"Arterial St {k + 1}", ARTERIAL)
+
+    # Local streets inside each block, spanning between its arterials
+    row_edges = np.r_[0, rows, size - 1]
+    col_edges = np.r_[0, cols, size - 1]
+    local_id = 0
+    for horizontal, edges, cross in ((True, row_edges, col_edges), (False, col_edges, row_edges)):
+        for lo, hi in zip(edges[:-1], edges[1:]):
+            inner = np.arange(lo + local_spacing, hi - 1, local_spacing)
+            inner = inner[rng.random(len(inner)) >= local_drop_rate]
+            for fixed in inner:
+                for a, b in zip(cross[:-1], cross[1:]):
+                    local_id += 1
+                    name = f"Local {'Ave' if horizontal else 'St'} {local_id}"
+                    network.add_street(int(fixed), int(a), int(b), name, horizontal)
+
+    # Candidate sites: non-road cells next to a road
+    is_road = grid == ROAD
+    next_to_road = np.zeros_like(is_road)
+    next_to_road[1:, :] |= is_road[:-1, :]
+    next_to_road[:-1, :] |= is_road[1:, :]
+    next_to_road[:, 1:] |= is_road[:, :-1]
+    next_to_road[:, :-1] |= is_road[:, 1:]
+    sites = np.flatnonzero(next_to_road & ~is_road)
+
+    if num_schools is None:
+        num_schools = max(1, size * size // 40_000)
+    if num_neighborhoods is None:
+        num_neighborhoods = max(7, size * size // 400)
+
+    picked = rng.choice(sites, size=min(len(sites), num_schools + num_neighborhoods), replace=False)
+    school_cells, neighborhood_cells = picked[:num_schools], picked[num_schools:]
+
+    sy, sx = np.divmod(school_cells, size)
+    grid[sy, sx] = SCHOOL
+    ny, nx = np.divmod(neighborhood_cells, size)
+    grid[ny, nx] = NEIGHBORHOOD
+
+    n = len(neighborhood_cells)
+    neighborhoods = pd.DataFrame({
+        "neighborhood_id": [f"N{i}" for i in range(n)],
+        "neighborhood_population": rng.integers(3000, 9001, size=n, dtype=np.int32),
+        "working_population_pct": np.round(rng.uniform(0.45, 0.7, size=n), 2),
+        "students_population": rng.integers(400, 1201, size=n, dtype=np.int32),
+        "x": nx.astype(np.int32),
+        "y": ny.astype(np.int32)
+    })
+    schools = pd.DataFrame({
+        "school_id": [f"S{i}" for i in range(len(school_cells))],
+        "x": sx.astype(np.int32),
+        "y": sy.astype(np.int32)
     })
-    grid[y][x + 1] = ROAD
 
+    return grid, network, neighborhoods, schools
+
+# ----------------------------
 # Save files
-pd.DataFrame(roads).to_csv("roads_raw.csv", index=False)
-pd.DataFrame(neighborhoods).to_csv("neighborhoods.csv", index=False)
+# ----------------------------
+def roads_frame(network):
+    columns = network.columns()
+    names = pd.Categorical.from_codes(columns.pop("street_id"), categories=network.street_names)
+    roads = pd.DataFrame(columns)
+    roads.insert(1, "street_name", names)
+    return roads
+
+
+def save_city(out_dir, fmt, grid, network, neighborhoods, schools):
+    os.makedirs(out_dir, exist_ok=True)
+    roads = roads_frame(network)
+
+    if fmt == "npz":
+        columns = network.columns()
+        np.savez_compressed(
+            os.path.join(out_dir, "city.npz"),
+            grid=grid,
+            street_names=np.array(network.street_names),
+            **{f"roads_{k}": v for k, v in columns.items()},
+            **{f"neighborhoods_{k}": neighborhoods[k].to_numpy() for k in neighborhoods.columns},
+            **{f"schools_{k}": schools[k].to_numpy() for k in schools.columns}
+        )
+        return [os.path.join(out_dir, "city.npz")]
+
+    np.save(os.path.join(out_dir, "grid.npy"), grid)
+
+    if fmt == "parquet":
+        files = {"roads.parquet": roads, "neighborhoods.parquet": neighborhoods, "schools.parquet": schools}
+        for name, df in files.items():
+            df.to_parquet(os.path.join(out_dir, name), index=False)
+    else:
+        files = {"roads_raw.csv": roads, "neighborhoods.csv": neighborhoods, "schools.csv": schools}
+        for name, df in files.items():
+            df.to_csv(os.path.join(out_dir, name), index=False)
+
+    return [os.path.join(out_dir, name) for name in ["grid.npy", *files]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the SafeFlow city grid")
+    parser.add_argument("--size", type=int, default=None, help="procedural city of size x size cells (up to ~2000)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--arterial-spacing", type=int, default=20)
+    parser.add_argument("--local-spacing", type=int, default=4)
+    parser.add_argument("--neighborhoods", type=int, default=None)
+    parser.add_argument("--schools", type=int, default=None)
+    parser.add_argument("--out-dir", default="city")
+    parser.add_argument("--format", choices=["parquet", "npz", "csv"], default="parquet")
+    args = parser.parse_args()
+
+    if args.size is None:
+        # Classic hand-placed 20x20 layout used by the app
+        grid, network, neighborhoods, schools = classic_city()
+        roads = roads_frame(network)[["road_id", "street_name", "from_x", "from_y", "to_x", "to_y"]]
+        roads.to_csv("roads_raw.csv", index=False)
+        neighborhoods.to_csv("neighborhoods.csv", index=False)
+
+        print("Grid generated!")
+        print("Files created: roads_raw.csv, neighborhoods.csv")
+    else:
+        start = time.perf_counter()
+        grid, network, neighborhoods, schools = procedural_city(
+            args.size,
+            seed=args.seed,
+            arterial_spacing=args.arterial_spacing,
+            local_spacing=args.local_spacing,
+            num_neighborhoods=args.neighborhoods,
+            num_schools=args.schools
+        )
+        files = save_city(args.out_dir, args.format, grid, network, neighborhoods, schools)
 
-print("Grid generated!")
-print("Files created: roads_raw.csv, neighborhoods.csv")
+        print(f"Grid {args.size}x{args.size} generated in {time.perf_counter() - start:.2f}s")
+        print(f"Roads: {len(network.columns()['road_id'])}, neighborhoods: {len(neighborhoods)}, schools: {len(schools)}")
+        print("Files created:", ", ".join(files))
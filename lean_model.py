@@ -0,0 +1,198 @@
+import argparse
+import json
+
+import numpy as np
+
+# ============================
+# Lean speed model artifact
+# ============================
+# FLAML's AutoML pickle drags in flaml, the estimator wrappers and the
+# whole search state just to call .predict. The export below keeps only
+# what prediction needs:
+#   - sklearn forests (rf / extra_tree) -> flattened NumPy node arrays
+#   - lgbm / xgboost                    -> the native booster model string
+# plus the feature order and the median imputation FLAML applies to
+# numeric columns. Loading a forest artifact needs NumPy only.
+LEAN_MODEL_PATH = "safeflow_speed_model.npz"
+
+FOREST_KINDS = ("rf", "extra_tree")
+BOOSTER_KINDS = ("lgbm", "xgboost")
+
+
+# ============================
+# Export (training side)
+# ============================
+def _flatten_forest(forest):
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset = 0
+
+    for tree in forest.estimators_:
+        t = tree.tree_
+        is_leaf = t.children_left < 0
+        roots.append(offset)
+        left.append(np.where(is_leaf, -1, t.children_left + offset))
+        right.append(np.where(is_leaf, -1, t.children_right + offset))
+        feature.append(np.where(is_leaf, 0, t.feature))
+        threshold.append(t.threshold)
+        value.append(t.value[:, 0, 0])
+        offset += t.node_count
+
+    return {
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value).astype(np.float64),
+        "roots": np.array(roots, dtype=np.int32)
+    }
+
+
+def _impute_values(automl, feature_names):
+    # FLAML fills missing numeric inputs with the training medians
+    transformer = automl._transformer
+    if transformer is None or transformer.transformer is None:
+        return np.full(len(feature_names), np.nan)
+
+    if transformer._cat_columns:
+        raise ValueError("Lean export only supports numeric (already one-hot encoded) features")
+
+    medians = dict(zip(transformer._num_columns, transformer.transformer.named_transformers_["continuous"].statistics_))
+    return np.array([medians.get(name, np.nan) for name in feature_names], dtype=np.float64)
+
+
+def _lean_arrays(kind, feature_names, impute_values, meta):
+    return {
+        "kind": np.array(kind),
+        "feature_names": np.array(feature_names),
+        "impute_values": impute_values,
+        "meta": np.array(json.dumps(meta or {}))
+    }
+
+
+def export_lean_booster(booster, path, meta=None):
+    # A LightGBM Booster trained directly (no FLAML); missing values are
+    # left to LightGBM, so nothing is imputed
+    feature_names = booster.feature_name()
+    arrays = _lean_arrays("lgbm", feature_names, np.full(len(feature_names), np.nan), meta)
+    arrays["booster"] = np.array(booster.model_to_string())
+
+    np.savez_compressed(path, **arrays)
+    return path
+
+
+def export_lean_model(automl, path=LEAN_MODEL_PATH, meta=None):
+    kind = automl.best_estimator
+    estimator = automl.model.estimator
+    feature_names = [str(c) for c in automl.feature_names_in_]
+
+    arrays = _lean_arrays(kind, feature_names, _impute_values(automl, feature_names), meta)
+
+    if kind in FOREST_KINDS:
+        arrays.update(_flatten_forest(estimator))
+    elif kind == "lgbm":
+        arrays["booster"] = np.array(estimator.booster_.model_to_string())
+    elif kind == "xgboost":
+        raw = estimator.get_booster().save_raw(raw_format="json")
+        arrays["booster"] = np.array(bytes(raw).decode("utf-8"))
+    else:
+        raise ValueError(f"Lean export not supported for estimator '{kind}'")
+
+    np.savez_compressed(path, **arrays)
+    return path
+
+
+# ============================
+# Loader (serving side)
+# ============================
+class LeanSpeedModel:
+    def __init__(self, path=LEAN_MODEL_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+
+        self.kind = str(arrays.pop("kind"))
+        self.feature_names_in_ = arrays.pop("feature_names")
+        self.impute_values = arrays.pop("impute_values")
+        self.meta = json.loads(str(arrays.pop("meta")))
+
+        if self.kind in FOREST_KINDS:
+            self.left = arrays["left"]
+            self.right = arrays["right"]
+            self.feature = arrays["feature"]
+            self.threshold = arrays["threshold"]
+            self.value = arrays["value"]
+            self.roots = arrays["roots"]
+            self.booster = None
+        elif self.kind == "lgbm":
+            import lightgbm as lgb
+
+            self.booster = lgb.Booster(model_str=str(arrays["booster"]))
+        elif self.kind == "xgboost":
+            import xgboost as xgb
+
+            self.booster = xgb.Booster()
+            self.booster.load_model(bytearray(str(arrays["booster"]).encode("utf-8")))
+        else:
+            raise ValueError(f"Unknown lean model kind '{self.kind}'")
+
+    def _matrix(self, X):
+        # Frames from FeatureEncoder already have the layout's column order
+        if hasattr(X, "columns") and list(X.columns) != list(self.feature_names_in_):
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=np.float64)
+
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self.impute_values, X)
+        return X
+
+    def _predict_forest(self, X):
+        # sklearn compares float32 inputs against the stored thresholds
+        X = X.astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+
+        while True:
+            internal = self.left[node] >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            step = np.where(go_left, self.left[node], self.right[node])
+            node = np.where(internal, step, node)
+
+        return self.value[node].mean(axis=1)
+
+    def predict(self, X):
+        X = self._matrix(X)
+
+        if self.booster is None:
+            return self._predict_forest(X)
+        if self.kind == "lgbm":
+            return self.booster.predict(X)
+
+        import xgboost as xgb
+
+        return self.booster.predict(xgb.DMatrix(X, feature_names=list(self.feature_names_in_)))
+
+
+def load_lean_model(path=LEAN_MODEL_PATH):
+    return LeanSpeedModel(path)
+
+
+# ============================
+# CLI: export an existing AutoML pickle
+# ============================
+if __name__ == "__main__":
+    import pickle
+
+    from road_speeds import file_sha256
+
+    parser = argparse.ArgumentParser(description="Export a FLAML speed model to a lean artifact")
+    parser.add_argument("model", nargs="?", default="safeflow_speed_model.pkl")
+    parser.add_argument("--out", default=LEAN_MODEL_PATH)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        automl = pickle.load(f)
+
+    export_lean_model(automl, args.out, meta={"source_sha256": file_sha256(args.model)})
+    print(f"Exported {automl.best_estimator} model to {args.out}")
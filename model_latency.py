@@ -0,0 +1,92 @@
+import time
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from road_speeds import road_feature_columns
+
+# ============================
+# Prediction latency
+# ============================
+# Median wall time of model.predict over a few repeats, after one warm-up
+# call (first calls pay for lazy imports and allocations).
+REPEATS = 20
+
+
+def time_predict(model, X, repeats=REPEATS):
+    model.predict(X)
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        model.predict(X)
+        times[i] = time.perf_counter() - start
+    return float(np.median(times))
+
+
+def measure_latency(model, X_batch, repeats=REPEATS):
+    # Single-row latency (first row of the batch) and whole-batch latency
+    row_seconds = time_predict(model, X_batch[:1], repeats)
+    batch_seconds = time_predict(model, X_batch, repeats)
+    return {
+        "row_ms": row_seconds * 1e3,
+        "batch_ms": batch_seconds * 1e3,
+        "batch_rows": len(X_batch),
+        "batch_us_per_row": batch_seconds * 1e6 / max(1, len(X_batch))
+    }
+
+
+# ============================
+# Routing batch
+# ============================
+# What the router actually sends: every road of the map in the
+# road_speeds feature layout, encoded with the model's encoder.
+# Morning rush in the rain is the default slider setting of the app.
+def routing_batch(encoder, roads_path="roads_raw.csv", hour=8, weather="rain", school_x=17):
+    roads_df = pd.read_csv(roads_path)
+    return encoder.transform_frame(road_feature_columns(roads_df, hour, weather, school_x))
+
+
+# ============================
+# Latency budget as a FLAML metric
+# ============================
+# RMSE on the validation fold, scaled up by how far the candidate is over
+# its latency budget (row_ms / batch_ms in milliseconds, None = no limit):
+#   loss = rmse * max(1, row_ms / row_budget, batch_ms / batch_budget)
+# Candidates within budget keep their plain RMSE, so a slower model only
+# wins if it is more accurate by more than it is over budget. Only the
+# candidate estimator is timed: AutoML.predict adds the same fixed
+# preprocessing cost to every candidate, and the app serves the lean
+# export anyway.
+def penalized_rmse(X_val, y_val, estimator, labels, X_train, y_train, *args,
+                   X_routing=None, row_ms=None, batch_ms=None, repeats=5, **kwargs):
+    preds = estimator.predict(X_val)
+    rmse = float(((preds - np.asarray(y_val)) ** 2).mean() ** 0.5)
+
+    latency = measure_latency(estimator, estimator_batch(estimator, X_routing), repeats)
+    over = max(
+        1.0,
+        latency["row_ms"] / row_ms if row_ms else 0.0,
+        latency["batch_ms"] / batch_ms if batch_ms else 0.0
+    )
+    return rmse * over, {
+        "rmse": rmse,
+        "row_ms": latency["row_ms"],
+        "batch_ms": latency["batch_ms"],
+        "over_budget": over > 1.0
+    }
+
+
+def latency_penalized_rmse(X_routing, row_ms=None, batch_ms=None, repeats=5):
+    # A partial of a module function, so the fitted AutoML stays picklable
+    return partial(penalized_rmse, X_routing=X_routing, row_ms=row_ms, batch_ms=batch_ms, repeats=repeats)
+
+
+def estimator_batch(estimator, X_routing):
+    # FLAML estimators see preprocessed data (constant columns dropped),
+    # so the routing batch gets the same columns
+    return X_routing[list(estimator.feature_names_in_)]
+
+
+def within_budget(latency, row_ms=None, batch_ms=None):
+    return (not row_ms or latency["row_ms"] <= row_ms) and (not batch_ms or latency["batch_ms"] <= batch_ms)
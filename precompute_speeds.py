@@ -0,0 +1,39 @@
+import argparse
+import pickle
+import time
+
+import pandas as pd
+
+from road_speeds import compute_speed_table, file_sha256, save_speed_table
+
+# ============================
+# Precompute road x hour x weather speeds
+# ============================
+# The app only varies hour, weather and the per-road distance to school,
+# so every speed it can ask the model for is enumerated here once and
+# stored as a float32 table that the app memory-maps instead of
+# unpickling the FLAML model.
+parser = argparse.ArgumentParser(description="Precompute the SafeFlow speed table")
+parser.add_argument("--model", default="safeflow_speed_model.pkl")
+parser.add_argument("--roads", default="roads_raw.csv")
+parser.add_argument("--out", default="speed_table.npy")
+parser.add_argument("--school-x", type=int, default=17)
+args = parser.parse_args()
+
+start = time.perf_counter()
+
+with open(args.model, "rb") as f:
+    automl = pickle.load(f)
+
+roads = pd.read_csv(args.roads)
+
+table = compute_speed_table(automl, roads, args.school_x)
+
+save_speed_table(table, args.out, {
+    "model_sha256": file_sha256(args.model),
+    "roads_sha256": file_sha256(args.roads),
+    "school_x": args.school_x
+})
+
+print(f"Speed table {table.shape} written to {args.out}")
+print(f"Size: {table.nbytes / 1024:.1f} KiB, took {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,188 @@
+import argparse
+import os
+import pickle
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from feature_encoder import load_encoder
+
+# ============================
+# Settings
+# ============================
+MODEL_PATH = "safeflow_speed_model.pkl"
+CHUNK_ROWS = 100_000
+PREDICTION_COLUMN = "predicted_speed"
+
+
+# ============================
+# Input: fixed-size chunks
+# ============================
+def file_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type: {path}")
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    fmt = file_format(path)
+
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_json(path, lines=True, chunksize=chunk_rows)
+
+
+# ============================
+# Output: written chunk by chunk
+# ============================
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self.fmt = file_format(path)
+        self.parquet_writer = None
+        self.first = True
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="w" if self.first else "a", header=self.first, index=False)
+        elif self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            with open(self.path, "w" if self.first else "a") as f:
+                df.to_json(f, orient="records", lines=True)
+        self.first = False
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+# ============================
+# Encoding + prediction
+# ============================
+def load_model(model_path=MODEL_PATH):
+    # The model plus the encoder saved next to it (or rebuilt from its layout)
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    return model, load_encoder(model_path, model)
+
+
+def predict_chunk(model, chunk, encoder):
+    # The encoder fills absent columns with 0, which would score a file in
+    # the wrong schema without complaint; only unseen category values may
+    # be zero-filled here
+    missing = encoder.missing_columns(chunk.columns)
+    if missing:
+        raise ValueError(f"Input is missing feature columns: {', '.join(missing)}")
+    return model.predict(encoder.transform_frame(chunk))
+
+
+# Worker processes load the model once and then only receive chunks
+_worker_model = None
+
+
+def _init_worker(model_path):
+    global _worker_model
+    _worker_model = load_model(model_path)
+
+
+def _predict_in_worker(chunk):
+    model, encoder = _worker_model
+    return predict_chunk(model, chunk, encoder)
+
+
+def iter_predictions(chunks, model_path=MODEL_PATH, workers=1):
+    # Yields (chunk, predictions) in input order. With a pool, at most
+    # 2 * workers chunks are in flight so memory stays bounded.
+    if workers <= 1:
+        model, encoder = load_model(model_path)
+        for chunk in chunks:
+            yield chunk, predict_chunk(model, chunk, encoder)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(_predict_in_worker, chunk)))
+            if len(pending) >= 2 * workers:
+                done_chunk, future = pending.popleft()
+                yield done_chunk, future.result()
+
+        while pending:
+            done_chunk, future = pending.popleft()
+            yield done_chunk, future.result()
+
+
+def predict_file(
+    input_path,
+    output_path,
+    model_path=MODEL_PATH,
+    chunk_rows=CHUNK_ROWS,
+    workers=1,
+    keep_columns=True,
+    log=sys.stderr
+):
+    writer = ChunkWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+
+    try:
+        chunks = read_chunks(input_path, chunk_rows)
+        for chunk, preds in iter_predictions(chunks, model_path, workers):
+            out = chunk if keep_columns else pd.DataFrame(index=chunk.index)
+            out = out.assign(**{PREDICTION_COLUMN: preds})
+            writer.write(out)
+
+            rows += len(chunk)
+            if log is not None:
+                elapsed = time.perf_counter() - start
+                print(f"{rows:,} rows  {rows / elapsed:,.0f} rows/s", file=log)
+    finally:
+        writer.close()
+
+    return rows, time.perf_counter() - start
+
+
+# ============================
+# CLI
+# ============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream speed predictions for a SafeFlow dataset file")
+    parser.add_argument("input", help="CSV, Parquet or JSONL file in the simulated dataset schema")
+    parser.add_argument("output", help="CSV, Parquet or JSONL file to write")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--predictions-only", action="store_true", help="write only the prediction column")
+    args = parser.parse_args()
+
+    rows, seconds = predict_file(
+        args.input,
+        args.output,
+        model_path=args.model,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        keep_columns=not args.predictions_only
+    )
+
+    print(f"Scored {rows:,} rows in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
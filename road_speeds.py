@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from feature_encoder import encoder_for_model
+
+# ============================
+# Shared road speed settings
+# ============================
+ROAD_DISTANCE_KM = 0.1
+MIN_SPEED_KMH = 5.0
+
+HOURS = list(range(24))
+WEATHER_OPTIONS = ["clear", "rain", "fog"]
+
+
+# ============================
+# Helper: file content hash
+# ============================
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ============================
+# Feature matrix for all roads
+# ============================
+# Raw feature columns (scalars are broadcast to every road by the encoder)
+def road_feature_columns(roads_df, hour, weather, school_x):
+    return {
+        "hour": hour,
+        "day_of_week": 1,
+        "is_school_day": 1,
+        "is_arrival_time": int(7 <= hour <= 9),
+        "is_dismissal_time": int(14 <= hour <= 16),
+        "weather_condition": weather,
+        "precipitation": int(weather == "rain"),
+        "visibility_level": "low" if weather in ["rain", "fog"] else "high",
+        "num_lanes": 2,
+        "speed_limit": 30,
+        "distance_km": ROAD_DISTANCE_KM,
+        "is_intersection": 0,
+        "neighborhood_population": 5000,
+        "working_population_pct": 0.6,
+        "students_population": 800,
+        "distance_to_school_m": np.abs(roads_df["to_x"].to_numpy() - school_x) * 100
+    }
+
+
+def predict_road_speeds(model, roads_df, hour, weather, school_x, encoder=None):
+    encoder = encoder or encoder_for_model(model)
+    X = encoder.transform_frame(road_feature_columns(roads_df, hour, weather, school_x))
+
+    return np.maximum(MIN_SPEED_KMH, model.predict(X))
+
+
+# ============================
+# Precomputed speed table
+# ============================
+# Layout is (hour, weather, road) so the lookup for one slider setting
+# is a single contiguous row of float32 speeds.
+def compute_speed_table(model, roads_df, school_x):
+    table = np.empty((len(HOURS), len(WEATHER_OPTIONS), len(roads_df)), dtype=np.float32)
+
+    for h in HOURS:
+        for w, weather in enumerate(WEATHER_OPTIONS):
+            table[h, w] = predict_road_speeds(model, roads_df, h, weather, school_x)
+
+    return table
+
+
+def speed_table_meta_path(table_path):
+    return os.path.splitext(table_path)[0] + ".json"
+
+
+def save_speed_table(table, table_path, meta):
+    np.save(table_path, table)
+
+    meta = dict(meta)
+    meta["shape"] = list(table.shape)
+    meta["weather_options"] = WEATHER_OPTIONS
+
+    with open(speed_table_meta_path(table_path), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_speed_table(table_path):
+    with open(speed_table_meta_path(table_path)) as f:
+        meta = json.load(f)
+
+    table = np.load(table_path, mmap_mode="r")
+    return table, meta
+
+
+def lookup_road_speeds(table, hour, weather):
+    return np.asarray(table[hour, WEATHER_OPTIONS.index(weather)], dtype=np.float64)
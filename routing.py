@@ -0,0 +1,184 @@
+import heapq
+
+import numpy as np
+from scipy.ndimage import distance_transform_cdt
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# ============================
+# Integer node ids
+# ============================
+# Grid cell (x, y) is node y * grid_size + x, so ids convert back to
+# coordinates with a divmod and never need string parsing.
+def node_ids(x, y, grid_size):
+    return np.asarray(y, dtype=np.int64) * grid_size + np.asarray(x, dtype=np.int64)
+
+
+def node_coords(ids, grid_size):
+    ids = np.asarray(ids, dtype=np.int64)
+    return ids % grid_size, ids // grid_size
+
+
+# ============================
+# Nearest road node lookup
+# ============================
+# One taxicab distance transform over the grid gives, for every cell, the
+# node id of the closest road endpoint, so snapping any origin (or a whole
+# array of origins) is a single array lookup.
+def build_nearest_node_lookup(node_x, node_y, grid_size):
+    no_road = np.ones((grid_size, grid_size), dtype=bool)
+    no_road[np.asarray(node_y), np.asarray(node_x)] = False
+
+    _, (iy, ix) = distance_transform_cdt(
+        no_road, metric="taxicab", return_distances=True, return_indices=True
+    )
+    return node_ids(ix, iy, grid_size).reshape(grid_size, grid_size)
+
+
+def build_road_node_lookup(roads_df, grid_size):
+    return build_nearest_node_lookup(
+        np.concatenate([roads_df["from_x"], roads_df["to_x"]]),
+        np.concatenate([roads_df["from_y"], roads_df["to_y"]]),
+        grid_size
+    )
+
+
+def snap_to_nodes(lookup, x, y):
+    # Points outside the grid snap via the closest border cell, which keeps
+    # the Manhattan-nearest answer exact
+    grid_size = lookup.shape[0]
+    x = np.clip(x, 0, grid_size - 1)
+    y = np.clip(y, 0, grid_size - 1)
+    return lookup[y, x]
+
+
+# ============================
+# CSR road graph
+# ============================
+def build_road_graph(from_ids, to_ids, weights, num_nodes):
+    from_ids = np.asarray(from_ids, dtype=np.int64)
+    to_ids = np.asarray(to_ids, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    # Roads are two-way: store both directions
+    rows = np.concatenate([from_ids, to_ids])
+    cols = np.concatenate([to_ids, from_ids])
+    data = np.concatenate([weights, weights])
+
+    # Sort by (row, col) and keep the cheapest of duplicate segments
+    keys = rows * num_nodes + cols
+    order = np.argsort(keys)
+    keys, data = keys[order], data[order]
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    if len(starts) < len(keys):
+        data = np.minimum.reduceat(data, starts)
+        keys = keys[starts]
+
+    rows, cols = np.divmod(keys, num_nodes)
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+
+    return csr_matrix((data, cols, indptr), shape=(num_nodes, num_nodes))
+
+
+def build_grid_road_graph(roads_df, weights, grid_size):
+    return build_road_graph(
+        node_ids(roads_df["from_x"], roads_df["from_y"], grid_size),
+        node_ids(roads_df["to_x"], roads_df["to_y"], grid_size),
+        weights,
+        grid_size * grid_size
+    )
+
+
+# ============================
+# Shortest paths
+# ============================
+def walk_predecessors(predecessors, node):
+    path = [node]
+    while predecessors[node] >= 0:
+        node = predecessors[node]
+        path.append(node)
+    return np.array(path, dtype=np.int64)
+
+
+# ============================
+# Reverse shortest-path tree
+# ============================
+# Every route ends at the same node, so one single-source search from that
+# node answers all origins: the predecessor array points each node one
+# step closer to the root and dist holds the full route cost.
+def shortest_path_tree(graph, root):
+    dist, pred = dijkstra(graph, directed=True, indices=root, return_predecessors=True)
+    return dist, pred
+
+
+def path_to_root(tree, node):
+    dist, pred = tree
+
+    if not np.isfinite(dist[node]):
+        return None, np.inf
+
+    return walk_predecessors(pred, node), float(dist[node])
+
+
+# ============================
+# A* point-to-point search
+# ============================
+# h(n) = Manhattan steps from n to the target * the cheapest cost of one
+# grid step anywhere in the graph. For travel-time weights that cheapest
+# step is ROAD_DISTANCE_KM / max speed, so the estimate never exceeds the
+# real remaining cost and A* still returns an optimal route.
+def heuristic_step_cost(graph, grid_size):
+    rows = np.repeat(np.arange(graph.shape[0]), np.diff(graph.indptr))
+    rx, ry = node_coords(rows, grid_size)
+    cx, cy = node_coords(graph.indices, grid_size)
+    steps = np.abs(rx - cx) + np.abs(ry - cy)
+
+    moving = steps > 0
+    if not moving.any():
+        return 0.0
+    return float((graph.data[moving] / steps[moving]).min())
+
+
+def astar_path(graph, source, target, grid_size, step_cost=None):
+    # Returns (path, cost, nodes_expanded); step_cost=0 turns this into
+    # Dijkstra with early exit, which is what A* is compared against
+    if step_cost is None:
+        step_cost = heuristic_step_cost(graph, grid_size)
+
+    indptr, indices, data = graph.indptr, graph.indices, graph.data
+    tx, ty = target % grid_size, target // grid_size
+
+    dist = {source: 0.0}
+    pred = {source: -1}
+    closed = set()
+    heap = [((abs(source % grid_size - tx) + abs(source // grid_size - ty)) * step_cost, source)]
+
+    while heap:
+        _, u = heapq.heappop(heap)
+        if u in closed:
+            continue
+        closed.add(u)
+
+        if u == target:
+            break
+
+        du = dist[u]
+        start, end = indptr[u], indptr[u + 1]
+        for v, w in zip(indices[start:end].tolist(), data[start:end].tolist()):
+            nd = du + w
+            if nd < dist.get(v, np.inf):
+                dist[v] = nd
+                pred[v] = u
+                h = (abs(v % grid_size - tx) + abs(v // grid_size - ty)) * step_cost
+                heapq.heappush(heap, (nd + h, v))
+
+    if target not in closed:
+        return None, np.inf, len(closed)
+
+    path = [target]
+    while pred[path[-1]] >= 0:
+        path.append(pred[path[-1]])
+
+    return np.array(path[::-1], dtype=np.int64), dist[target], len(closed)
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from predict_speed import PREDICTION_COLUMN, predict_file
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "safeflow_speed_model.pkl")
+DATA_PATH = os.path.join(BASE_DIR, "Data", "safeflow_ai_simulated_dataset.csv")
+
+
+def test_worker_pool_matches_single_process(tmp_path):
+    sample = tmp_path / "sample.csv"
+    pd.read_csv(DATA_PATH, nrows=2000).to_csv(sample, index=False)
+
+    outputs = {}
+    for workers in (1, 2):
+        out = tmp_path / f"preds-{workers}.csv"
+        rows, _ = predict_file(
+            str(sample), str(out),
+            model_path=MODEL_PATH, chunk_rows=500, workers=workers, log=None
+        )
+        assert rows == 2000
+        outputs[workers] = pd.read_csv(out)[PREDICTION_COLUMN].to_numpy()
+
+    np.testing.assert_allclose(outputs[2], outputs[1])
+
+
+def test_missing_feature_columns_raise(tmp_path):
+    sample = tmp_path / "preds.jsonl"
+    pd.DataFrame({PREDICTION_COLUMN: [30.0, 31.5]}).to_json(sample, orient="records", lines=True)
+
+    with pytest.raises(ValueError, match="missing feature columns"):
+        predict_file(str(sample), str(tmp_path / "out.csv"), model_path=MODEL_PATH, log=None)
@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from generate_dataset import (
+    NEIGHBORHOODS_PATH,
+    ROADS_PATH,
+    SEED,
+    SPEED_CHOICES,
+    congestion_level,
+    generate_weather,
+    time_congestion_weight
+)
+
+# ============================
+# Settings
+# ============================
+RATE = 1000              # events per second of wall time (0 = as fast as possible)
+STEP_MINUTES = 5         # simulated minutes between two observations of a road
+WEATHER_MINUTES = 30     # weather changes once per 30-minute window, like the dataset
+PACE_INTERVAL = 0.05     # seconds of events released at once when throttled
+START_TIME = np.datetime64("2026-01-05T00:00")   # a Monday
+
+
+# ============================
+# Simulation (one tick = every road observed once)
+# ============================
+# Each tick reuses the dataset logic: a neighborhood is sampled per road,
+# volume follows time_congestion_weight, speed drops with volume and the
+# congestion label comes from congestion_level. Speed limits are fixed
+# per road for the whole stream.
+def simulate_tick(rng, road_ids, speed_limits, neighborhood_df, minute, weather):
+    n = len(road_ids)
+    hour = (minute // 60) % 24
+
+    nb_idx = rng.integers(0, len(neighborhood_df), size=n)
+    base_volume = (
+        neighborhood_df["neighborhood_population"].to_numpy()[nb_idx]
+        * neighborhood_df["working_population_pct"].to_numpy()[nb_idx]
+    )
+    traffic_volume = np.floor(
+        (base_volume / 150) * time_congestion_weight(hour) + rng.integers(5, 21, size=n)
+    ).astype(np.int32)
+    average_speed = np.round(np.maximum(10, speed_limits - traffic_volume * 0.25), 1)
+
+    condition, precipitation, visibility = weather
+    return pd.DataFrame({
+        "time": str(START_TIME + np.timedelta64(int(minute), "m")),
+        "day_of_week": (minute // (24 * 60)) % 7,
+        "hour": hour,
+        "road_id": road_ids,
+        "weather_condition": str(condition),
+        "precipitation": int(precipitation),
+        "visibility_level": str(visibility),
+        "traffic_volume": traffic_volume,
+        "average_speed": average_speed,
+        "congestion_level": congestion_level(traffic_volume)
+    })
+
+
+class Pacer:
+    # Releases events on a fixed schedule: event k is due at start + k / rate
+    def __init__(self, rate):
+        self.rate = rate
+        self.start = time.perf_counter()
+        self.sent = 0
+
+    async def wait(self, n):
+        if self.rate:
+            delay = self.start + self.sent / self.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self.sent += n
+
+
+async def traffic_batches(
+    roads_df,
+    neighborhood_df,
+    rate=RATE,
+    seed=SEED,
+    step_minutes=STEP_MINUTES,
+    limit=None
+):
+    # Time-ordered batches (DataFrames) of per-road observations. With a
+    # rate, batches hold about PACE_INTERVAL seconds of events so pacing
+    # stays smooth without a sleep per event.
+    rng = np.random.default_rng(seed)
+    road_ids = roads_df["road_id"].to_numpy()
+    speed_limits = SPEED_CHOICES[rng.integers(0, len(SPEED_CHOICES), size=len(road_ids))]
+
+    batch_size = max(1, int(rate * PACE_INTERVAL)) if rate else len(road_ids)
+    pacer = Pacer(rate)
+    emitted = 0
+    minute = 0
+    weather = None
+    weather_window = None
+
+    while limit is None or emitted < limit:
+        # New weather whenever the tick lands in another 30-minute window,
+        # whatever the step size
+        if minute // WEATHER_MINUTES != weather_window:
+            weather = generate_weather(rng)
+            weather_window = minute // WEATHER_MINUTES
+
+        tick = simulate_tick(rng, road_ids, speed_limits, neighborhood_df, minute, weather)
+        for lo in range(0, len(tick), batch_size):
+            batch = tick.iloc[lo:lo + batch_size]
+            if limit is not None:
+                batch = batch.iloc[:limit - emitted]
+                if batch.empty:
+                    return
+
+            await pacer.wait(len(batch))
+            yield batch
+            emitted += len(batch)
+
+        minute += step_minutes
+
+
+async def traffic_events(roads_df, neighborhood_df, **kwargs):
+    # Same stream, one dict per observation
+    async for batch in traffic_batches(roads_df, neighborhood_df, **kwargs):
+        for event in batch.to_dict("records"):
+            yield event
+
+
+# ============================
+# JSONL sinks
+# ============================
+def to_jsonl(batch):
+    text = batch.to_json(orient="records", lines=True)
+    return text if text.endswith("\n") else text + "\n"
+
+
+async def stream_to_stdout(roads_df, neighborhood_df, **kwargs):
+    out = sys.stdout
+    events = 0
+    start = time.perf_counter()
+
+    try:
+        async for batch in traffic_batches(roads_df, neighborhood_df, **kwargs):
+            out.write(to_jsonl(batch))
+            out.flush()
+            events += len(batch)
+    except BrokenPipeError:
+        pass
+
+    return events, time.perf_counter() - start
+
+
+async def serve(roads_df, neighborhood_df, host, port, **kwargs):
+    # Every client gets its own stream (same seed -> same events)
+    async def handle(reader, writer):
+        peer = writer.get_extra_info("peername")
+        print(f"Client connected: {peer}", file=sys.stderr)
+        try:
+            async for batch in traffic_batches(roads_df, neighborhood_df, **kwargs):
+                writer.write(to_jsonl(batch).encode())
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+            print(f"Client disconnected: {peer}", file=sys.stderr)
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Streaming traffic events on {host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+# ============================
+# CLI
+# ============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream simulated per-road traffic observations as JSONL")
+    parser.add_argument("--rate", type=float, default=RATE, help="events per second (0 = unthrottled)")
+    parser.add_argument("--step-minutes", type=int, default=STEP_MINUTES, help="simulated minutes per tick")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many events")
+    parser.add_argument("--port", type=int, default=None, help="serve on a local TCP port instead of stdout")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--roads", default=ROADS_PATH)
+    parser.add_argument("--neighborhoods", default=NEIGHBORHOODS_PATH)
+    args = parser.parse_args()
+
+    roads_df = pd.read_csv(args.roads)
+    neighborhood_df = pd.read_csv(args.neighborhoods)
+    options = dict(rate=args.rate, seed=args.seed, step_minutes=args.step_minutes, limit=args.limit)
+
+    try:
+        if args.port is not None:
+            asyncio.run(serve(roads_df, neighborhood_df, args.host, args.port, **options))
+        else:
+            events, seconds = asyncio.run(stream_to_stdout(roads_df, neighborhood_df, **options))
+            print(f"Streamed {events:,} events in {seconds:.2f}s ({events / max(seconds, 1e-9):,.0f} events/s)", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
@@ -1,34 +1,98 @@
-import pandas as pd
+import argparse
+import io
+import json
+import os
+import pickle
+import time
+
 from flaml import AutoML
 from sklearn.model_selection import train_test_split
 
+from dataset_io import load_dataset
+from feature_encoder import DROP_COLS, FeatureEncoder, encoder_path, load_encoder
+from lean_model import LeanSpeedModel, export_lean_model
+from model_latency import estimator_batch, latency_penalized_rmse, measure_latency, routing_batch, within_budget
+from road_speeds import file_sha256
+
+MODEL_PATH = "safeflow_speed_model.pkl"
+HISTORY_PATH = "safeflow_speed_model.history.json"
+ESTIMATORS = ["lgbm", "rf", "xgboost"]
+
+# ----------------------------
+# Retrain mode (warm start)
+# ----------------------------
+# --retrain seeds the search with the best config per estimator of the
+# previous model, so FLAML starts from known-good points instead of the
+# defaults. Every run is appended to the search history; once there are
+# PRUNE_AFTER_RUNS runs, retrains skip estimators that did not win any of
+# the last PRUNE_AFTER_RUNS runs.
+PRUNE_AFTER_RUNS = 3
+
+# ----------------------------
+# Latency budget
+# ----------------------------
+# The router predicts every road segment, so each candidate is also timed
+# on a routing batch (all roads of --latency-roads in the road_speeds
+# feature layout). With --row-latency-ms / --batch-latency-ms, candidates
+# over budget have their RMSE scaled up by how far over they are (see
+# model_latency.latency_penalized_rmse). The final model's latency is
+# always measured and stored in the history and the lean model metadata.
+
+parser = argparse.ArgumentParser(description="Train the SafeFlow speed model")
+parser.add_argument("--retrain", action="store_true", help="warm-start from the saved model and prune estimators")
+parser.add_argument("--time-budget", type=int, default=120, help="seconds (2 minutes is enough from scratch)")
+parser.add_argument("--row-latency-ms", type=float, default=None, help="max single-row predict latency")
+parser.add_argument("--batch-latency-ms", type=float, default=None, help="max predict latency for the routing batch")
+parser.add_argument("--latency-roads", default="roads_raw.csv", help="roads whose features form the routing batch")
+args = parser.parse_args()
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def prune_estimators(history, estimators, runs=PRUNE_AFTER_RUNS):
+    if len(history) < runs:
+        return list(estimators)
+    winners = {run["best_estimator"] for run in history[-runs:]}
+    kept = [e for e in estimators if e in winners]
+    return kept or list(estimators)
+
+
+def to_json(value):
+    # FLAML configs hold NumPy scalars
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    return value.item() if hasattr(value, "item") else value
+
 # ----------------------------
 # Load dataset
 # ----------------------------
-df = pd.read_csv("safeflow_ai_simulated_dataset.csv")
+# CSV, typed Parquet (python dataset_io.py in.csv out.parquet) or a
+# partitioned directory; all load with the compact dataset schema.
+# Found in the working directory, next to this script or in Data/;
+# a CSV is cached as Parquet after the first read.
+DATA_PATH = "safeflow_ai_simulated_dataset.csv"
+
+df = load_dataset(DATA_PATH)
 
 # ----------------------------
 # Target & features
 # ----------------------------
 TARGET = "average_speed"
 
-# Drop columns that leak target or are IDs
-DROP_COLS = [
-    "average_speed",
-    "traffic_volume",
-    "congestion_level",
-    "accident_risk",
-    "road_id",
-    "start_node",
-    "end_node",
-    "neighborhood_id"
-]
-
-X = df.drop(columns=DROP_COLS)
+# Columns that leak the target or are IDs (DROP_COLS) are left out of
+# the encoder's layout; categoricals are one-hot encoded by it. The same
+# fitted encoder is saved next to the model for serving.
+encoder = FeatureEncoder.fit(df, drop=DROP_COLS)
+
+X = encoder.transform_frame(df)
 y = df[TARGET]
 
-# One-hot encode categorical variables
-X = pd.get_dummies(X)
+X_routing = routing_batch(encoder, args.latency_roads)
 
 # ----------------------------
 # Train / test split
@@ -40,33 +104,115 @@ X_train, X_test, y_train, y_test = train_test_split(
 # ----------------------------
 # AutoML
 # ----------------------------
+history = load_history()
+estimators = ESTIMATORS
+starting_points = None
+previous = None
+
+if args.retrain and os.path.exists(MODEL_PATH):
+    with open(MODEL_PATH, "rb") as f:
+        previous = pickle.load(f)
+
+    estimators = prune_estimators(history, ESTIMATORS)
+    starting_points = {
+        e: config for e, config in previous.best_config_per_estimator.items()
+        if config is not None and e in estimators
+    }
+    print(f"Warm start from {MODEL_PATH} (best: {previous.best_estimator}), estimators: {estimators}")
+
+metric = "rmse"
+if args.row_latency_ms or args.batch_latency_ms:
+    metric = latency_penalized_rmse(X_routing, args.row_latency_ms, args.batch_latency_ms)
+    print(f"Latency budget: {args.row_latency_ms} ms/row, {args.batch_latency_ms} ms/{len(X_routing)} roads")
+
 automl = AutoML()
 
+start = time.perf_counter()
 automl.fit(
     X_train,
     y_train,
     task="regression",
-    time_budget=120,        # 2 minutes is enough
-    metric="rmse",
-    estimator_list=["lgbm", "rf", "xgboost"],
+    time_budget=args.time_budget,
+    metric=metric,
+    estimator_list=estimators,
+    starting_points=starting_points,
     seed=42
 )
+fit_seconds = time.perf_counter() - start
 
 # ----------------------------
 # Evaluation
 # ----------------------------
-preds = automl.predict(X_test)
+def test_rmse(model, X):
+    preds = model.predict(X)
+    return float(((preds - y_test) ** 2).mean() ** 0.5)
 
-rmse = ((preds - y_test) ** 2).mean() ** 0.5
+
+rmse = test_rmse(automl, X_test)
 print(f"Test RMSE: {rmse:.2f}")
 
+# Latency of the chosen estimator (what the budget constrains) and of
+# its lean export (what the router serves), on the routing batch
+latency = measure_latency(automl.model, estimator_batch(automl.model, X_routing))
+in_budget = within_budget(latency, args.row_latency_ms, args.batch_latency_ms)
+
+lean_buffer = io.BytesIO()
+export_lean_model(automl, lean_buffer)
+lean_buffer.seek(0)
+latency["lean"] = measure_latency(LeanSpeedModel(lean_buffer), X_routing)
+
+print(
+    f"Predict latency ({automl.best_estimator}): {latency['row_ms']:.2f} ms/row, "
+    f"{latency['batch_ms']:.2f} ms/{latency['batch_rows']} roads"
+    + ("" if in_budget else " -- OVER BUDGET")
+)
+print(f"Lean export: {latency['lean']['row_ms']:.2f} ms/row, {latency['lean']['batch_ms']:.2f} ms/{len(X_routing)} roads")
+
+previous_rmse = None
+if previous is not None:
+    # Same test rows, encoded with the previous model's own layout
+    previous_encoder = load_encoder(MODEL_PATH, previous)
+    previous_rmse = test_rmse(previous, previous_encoder.transform_frame(df.loc[X_test.index]))
+    print(f"Previous model RMSE on the same test rows: {previous_rmse:.2f}")
+
 # ----------------------------
-# Save model (CORRECT WAY)
+# Search history
 # ----------------------------
-import pickle
+history.append({
+    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    "mode": "retrain" if previous is not None else "scratch",
+    "rows": len(df),
+    "time_budget": args.time_budget,
+    "fit_seconds": round(fit_seconds, 1),
+    "estimators": estimators,
+    "best_estimator": automl.best_estimator,
+    "best_config": to_json(automl.best_config),
+    "best_loss_per_estimator": to_json(automl.best_loss_per_estimator),
+    "test_rmse": rmse,
+    "previous_test_rmse": previous_rmse,
+    "latency_budget": {"row_ms": args.row_latency_ms, "batch_ms": args.batch_latency_ms},
+    "latency": latency,
+    "within_latency_budget": in_budget
+})
+with open(HISTORY_PATH, "w") as f:
+    json.dump(history, f, indent=2)
 
-with open("safeflow_speed_model.pkl", "wb") as f:
+# ----------------------------
+# Save model (CORRECT WAY)
+# ----------------------------
+with open(MODEL_PATH, "wb") as f:
     pickle.dump(automl, f)
 
+encoder.save(encoder_path(MODEL_PATH))
+
+# ----------------------------
+# Export lean predictor (no flaml needed to serve)
+# ----------------------------
+export_lean_model(
+    automl,
+    "safeflow_speed_model.npz",
+    meta={"source_sha256": file_sha256(MODEL_PATH), "latency": latency}
+)
+
 print("Model trained and saved!")
 
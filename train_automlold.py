@@ -1,11 +1,17 @@
+import argparse
 import os
-import pandas as pd
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
 import joblib
 
 from flaml import AutoML
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.compose import ColumnTransformer
+
+from dataset_io import load_dataset
+from feature_encoder import FeatureEncoder, encoder_path
 
 # ============================================================
 # Paths (robust to where script is run from)
@@ -17,15 +23,6 @@ DATA_PATH = os.path.join(
     "safeflow_ai_simulated_dataset.csv"
 )
 
-# ============================================================
-# Load dataset
-# ============================================================
-df = pd.read_csv(DATA_PATH)
-
-print("Dataset loaded.")
-print("Rows:", len(df))
-print("Columns:", list(df.columns))
-
 # ============================================================
 # Feature columns (MATCHES YOUR DATASET)
 # ============================================================
@@ -52,98 +49,171 @@ FEATURE_COLUMNS = [
 TARGET_CONGESTION = "congestion_level"
 TARGET_RISK = "accident_risk"
 
-X = df[FEATURE_COLUMNS]
-y_congestion = df[TARGET_CONGESTION]
-y_risk = df[TARGET_RISK]
-
-# ============================================================
-# Preprocessing (One-hot encode categoricals)
-# ============================================================
-CATEGORICAL_COLS = [
-    "weather_condition",
-    "visibility_level"
-]
-
-preprocessor = ColumnTransformer(
-    transformers=[
-        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_COLS)
-    ],
-    remainder="passthrough"
-)
-
-X_processed = preprocessor.fit_transform(X)
-
-# ============================================================
-# Train / test split (same split for both targets)
-# ============================================================
-(
-    X_train,
-    X_test,
-    y_cong_train,
-    y_cong_test,
-    y_risk_train,
-    y_risk_test
-) = train_test_split(
-    X_processed,
-    y_congestion,
-    y_risk,
-    test_size=0.2,
-    random_state=42,
-    stratify=y_congestion
-)
-
-# ============================================================
-# AutoML — Congestion Model
-# ============================================================
-automl_congestion = AutoML()
-
-automl_congestion.fit(
-    X_train,
-    y_cong_train,
-    task="classification",
-    time_budget=120,
-    metric="accuracy",
-    seed=42
-)
-
-
+TIME_BUDGET = 120   # seconds per search; both searches run at the same time
 
 # ============================================================
-# AutoML — Accident Risk Model
+# Shared feature matrix
 # ============================================================
-automl_risk = AutoML()
-
-automl_risk.fit(
-    X_train,
-    y_risk_train,
-    task="classification",
-    time_budget=120,
-    metric="accuracy",
-    seed=42
-)
-
-
-
-# ============================================================
-# Evaluation
-# ============================================================
-cong_acc = automl_congestion.score(X_test, y_cong_test)
-risk_acc = automl_risk.score(X_test, y_risk_test)
+# X_train is copied once into shared memory; each training process maps
+# the same block instead of receiving its own pickled copy.
+def share_array(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
 
-print("\n=== MODEL PERFORMANCE ===")
-print("Congestion accuracy:", round(cong_acc, 3))
-print("Accident risk accuracy:", round(risk_acc, 3))
-print("Best congestion model:", automl_congestion.model)
-print("Best risk model:", automl_risk.model)
 
-# ============================================================
-# Save models + preprocessor
-# ============================================================
-joblib.dump(preprocessor, os.path.join(BASE_DIR, "preprocessor.pkl"))
-joblib.dump(automl_congestion, os.path.join(BASE_DIR, "congestion_model.pkl"))
-joblib.dump(automl_risk, os.path.join(BASE_DIR, "accident_model.pkl"))
-
-print("\nSaved files:")
-print(" - preprocessor.pkl")
-print(" - congestion_model.pkl")
-print(" - accident_model.pkl")
\ No newline at end of file
+def attach_array(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+# ============================================================
+# CPU allotment: disjoint CPU sets, one per job
+# ============================================================
+def cpu_allotments(n_jobs):
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    per_job = max(1, len(cpus) // n_jobs)
+    # With fewer CPUs than jobs, jobs share CPUs instead of getting none
+    return [cpus[(i * per_job) % len(cpus):][:per_job] for i in range(n_jobs)]
+
+
+# ============================================================
+# One AutoML search (runs in its own process)
+# ============================================================
+def train_model(name, x_spec, y_train, cpus, time_budget, model_path):
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    shm, X_train = attach_array(x_spec)
+    try:
+        automl = AutoML()
+        start = time.perf_counter()
+        automl.fit(
+            X_train,
+            y_train,
+            task="classification",
+            time_budget=time_budget,
+            metric="accuracy",
+            n_jobs=len(cpus),
+            seed=42,
+            verbose=0
+        )
+        seconds = time.perf_counter() - start
+    finally:
+        del X_train
+        shm.close()
+
+    joblib.dump(automl, model_path)
+    return name, model_path, seconds
+
+
+def train_concurrently(X_train, targets, time_budget=TIME_BUDGET):
+    # targets: [(name, y_train, model_path), ...]; returns {name: AutoML}
+    shm, x_spec = share_array(X_train)
+    allotments = cpu_allotments(len(targets))
+    models = {}
+
+    try:
+        with ProcessPoolExecutor(max_workers=len(targets)) as pool:
+            futures = [
+                pool.submit(train_model, name, x_spec, y_train, cpus, time_budget, model_path)
+                for (name, y_train, model_path), cpus in zip(targets, allotments)
+            ]
+            for future, cpus in zip(futures, allotments):
+                name, model_path, seconds = future.result()
+                print(f"{name}: {seconds:.1f}s on CPUs {cpus}")
+                models[name] = joblib.load(model_path)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return models
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the congestion and accident-risk models concurrently")
+    parser.add_argument("--time-budget", type=int, default=TIME_BUDGET, help="seconds per search")
+    args = parser.parse_args()
+
+    # ============================================================
+    # Load dataset (typed: categoricals + narrow ints, only needed columns)
+    # ============================================================
+    df = load_dataset(DATA_PATH, columns=FEATURE_COLUMNS + [TARGET_CONGESTION, TARGET_RISK])
+
+    print("Dataset loaded.")
+    print("Rows:", len(df))
+    print("Columns:", list(df.columns))
+    print(f"Memory: {df.memory_usage(deep=True).sum() / 1e6:.2f} MB")
+
+    X = df[FEATURE_COLUMNS]
+    y_congestion = df[TARGET_CONGESTION]
+    y_risk = df[TARGET_RISK]
+
+    # ============================================================
+    # Preprocessing (shared FeatureEncoder, one-hot encodes categoricals)
+    # ============================================================
+    encoder = FeatureEncoder.fit(X)
+
+    X_processed = encoder.transform(X)
+
+    # ============================================================
+    # Train / test split (same split for both targets)
+    # ============================================================
+    (
+        X_train,
+        X_test,
+        y_cong_train,
+        y_cong_test,
+        y_risk_train,
+        y_risk_test
+    ) = train_test_split(
+        X_processed,
+        y_congestion,
+        y_risk,
+        test_size=0.2,
+        random_state=42,
+        stratify=y_congestion
+    )
+
+    # ============================================================
+    # AutoML — congestion and accident-risk models, in parallel
+    # ============================================================
+    congestion_path = os.path.join(BASE_DIR, "congestion_model.pkl")
+    risk_path = os.path.join(BASE_DIR, "accident_model.pkl")
+
+    start = time.perf_counter()
+    models = train_concurrently(
+        np.ascontiguousarray(X_train),
+        [
+            ("congestion", y_cong_train.to_numpy(), congestion_path),
+            ("accident_risk", y_risk_train.to_numpy(), risk_path)
+        ],
+        time_budget=args.time_budget
+    )
+    print(f"Training wall time: {time.perf_counter() - start:.1f}s")
+
+    automl_congestion = models["congestion"]
+    automl_risk = models["accident_risk"]
+
+    # ============================================================
+    # Evaluation
+    # ============================================================
+    cong_acc = automl_congestion.score(X_test, y_cong_test)
+    risk_acc = automl_risk.score(X_test, y_risk_test)
+
+    print("\n=== MODEL PERFORMANCE ===")
+    print("Congestion accuracy:", round(cong_acc, 3))
+    print("Accident risk accuracy:", round(risk_acc, 3))
+    print("Best congestion model:", automl_congestion.model)
+    print("Best risk model:", automl_risk.model)
+
+    # ============================================================
+    # Save encoder next to each model (models are saved by their job)
+    # ============================================================
+    for path in [congestion_path, risk_path]:
+        encoder.save(encoder_path(path))
+
+    print("\nSaved files:")
+    print(" - congestion_model.pkl (+ congestion_model.encoder.json)")
+    print(" - accident_model.pkl (+ accident_model.encoder.json)")
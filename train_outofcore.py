@@ -0,0 +1,352 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from dataset_io import open_dataset, resolve_dataset_path, to_schema_table
+from feature_encoder import DROP_COLS, FeatureEncoder, encoder_path
+from lean_model import export_lean_booster
+
+# ============================
+# Out-of-core LightGBM training
+# ============================
+# For datasets larger than RAM (e.g. 100M simulated rows):
+#   1. stream the input (CSV, Parquet or a partitioned directory) in
+#      chunks and encode each chunk with the shared FeatureEncoder into
+#      float32 .npy shards on disk, splitting rows into train / valid /
+#      test as they stream past;
+#   2. let LightGBM build its binned train and valid Datasets from the
+#      shards through lgb.Sequence (memory-mapped, read in batches) and
+#      save them with save_binary;
+#   3. train from the binary cache, early stopping on valid, and score
+#      the test shards once at the end (valid is not held out: early
+#      stopping picked the iteration on it). Later runs with the same
+#      input reuse the cache and skip steps 1-2.
+# Only one chunk of raw rows is in memory at a time; LightGBM keeps its
+# compact binned copy (about one byte per feature per row).
+TARGET = "average_speed"
+CACHE_DIR = "ooc_cache"
+CHUNK_ROWS = 1_000_000
+VALID_FRACTION = 0.1
+TEST_FRACTION = 0.1
+PARTS = ["train", "valid", "test"]
+SEED = 42
+OUT_PATH = "safeflow_speed_model_ooc.npz"
+
+DEFAULT_PARAMS = {
+    "objective": "regression",
+    "metric": "rmse",
+    "learning_rate": 0.1,
+    "num_leaves": 31,
+    "min_data_in_leaf": 20,
+    "max_bin": 255,
+    "verbosity": -1,
+    "seed": SEED
+}
+
+
+# ----------------------------
+# Input fingerprint (cache key)
+# ----------------------------
+def source_fingerprint(path):
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "**", "*.parquet"), recursive=True))
+    else:
+        files = [path]
+
+    h = hashlib.sha256()
+    for f in files:
+        stat = os.stat(f)
+        h.update(f"{os.path.relpath(f, path) if os.path.isdir(path) else f}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+# ----------------------------
+# Encoder layout from a streamed pass over the categorical columns
+# ----------------------------
+def fit_streaming_encoder(dataset, chunk_rows):
+    schema = dataset.schema
+    categorical = [
+        field.name for field in schema
+        if field.name not in DROP_COLS
+        and (pa.types.is_dictionary(field.type) or pa.types.is_string(field.type))
+    ]
+
+    values = {column: set() for column in categorical}
+    if categorical:
+        for batch in dataset.to_batches(columns=categorical, batch_size=chunk_rows):
+            for column in categorical:
+                unique = pc.unique(batch.column(column))
+                if pa.types.is_dictionary(unique.type):
+                    unique = unique.dictionary_decode()
+                values[column].update(v for v in unique.to_pylist() if v is not None)
+
+    # One row with the full category lists is enough to fix the layout
+    sample = to_schema_table(dataset.head(1)).to_pandas()
+    for column in categorical:
+        sample[column] = pd.Categorical(sample[column].astype(str), categories=sorted(values[column]))
+
+    return FeatureEncoder.fit(sample, drop=DROP_COLS)
+
+
+# ----------------------------
+# Step 1: chunks -> encoded shards
+# ----------------------------
+def write_shards(dataset, encoder, cache_dir, chunk_rows, valid_fraction, test_fraction, seed):
+    # Rows go to test / valid with probability test_fraction /
+    # valid_fraction; the draw depends only on the seed and the stream
+    # order, so the split is reproducible
+    rng = np.random.default_rng(seed)
+    buffer = np.empty((chunk_rows, encoder.n_features), dtype=np.float32)
+    counts = {part: 0 for part in PARTS}
+    shards = {part: [] for part in PARTS}
+
+    label_files = {part: open(os.path.join(cache_dir, f"{part}_label.f32"), "wb") for part in counts}
+    try:
+        for i, batch in enumerate(dataset.to_batches(batch_size=chunk_rows)):
+            chunk = to_schema_table(pa.Table.from_batches([batch])).to_pandas()
+            X = encoder.transform(chunk, out=buffer)
+            y = chunk[TARGET].to_numpy(dtype=np.float32)
+            draw = rng.random(len(chunk))
+            is_test = draw < test_fraction
+            is_valid = ~is_test & (draw < test_fraction + valid_fraction)
+
+            for part, mask in (("train", ~(is_test | is_valid)), ("valid", is_valid), ("test", is_test)):
+                if not mask.any():
+                    continue
+                shard = os.path.join(cache_dir, f"{part}-{i:05d}.npy")
+                np.save(shard, X[mask])
+                y[mask].tofile(label_files[part])
+                shards[part].append(shard)
+                counts[part] += int(mask.sum())
+
+            print(f"  encoded chunk {i}: " + " / ".join(f"{counts[part]:,} {part}" for part in PARTS) + " rows")
+    finally:
+        for f in label_files.values():
+            f.close()
+
+    return shards, counts
+
+
+class ShardSequence(lgb.Sequence):
+    # One memory-mapped shard; LightGBM reads it in batch_size slices.
+    # Shards are float32 on disk, LightGBM wants float64 per slice.
+    def __init__(self, path, batch_size=65_536):
+        self.data = np.load(path, mmap_mode="r")
+        self.batch_size = batch_size
+
+    def __getitem__(self, idx):
+        return np.asarray(self.data[idx], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.data)
+
+
+# ----------------------------
+# Step 2: shards -> LightGBM binary datasets
+# ----------------------------
+def build_binary_cache(
+    input_path,
+    cache_dir,
+    params,
+    chunk_rows=CHUNK_ROWS,
+    valid_fraction=VALID_FRACTION,
+    test_fraction=TEST_FRACTION,
+    seed=SEED
+):
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.makedirs(cache_dir)
+
+    dataset = open_dataset(input_path)
+
+    start = time.perf_counter()
+    encoder = fit_streaming_encoder(dataset, chunk_rows)
+    print(f"Encoder layout: {encoder.n_features} features ({time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    shards, counts = write_shards(dataset, encoder, cache_dir, chunk_rows, valid_fraction, test_fraction, seed)
+    print(f"Shards written in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    dataset_params = {"max_bin": params["max_bin"], "verbosity": -1}
+    labels = {
+        part: np.memmap(os.path.join(cache_dir, f"{part}_label.f32"), dtype=np.float32, mode="r")
+        for part in ["train", "valid"]
+    }
+
+    train_set = lgb.Dataset(
+        [ShardSequence(s) for s in shards["train"]],
+        label=np.asarray(labels["train"]),
+        feature_name=encoder.feature_names,
+        params=dataset_params,
+        free_raw_data=True
+    ).construct()
+    train_set.save_binary(os.path.join(cache_dir, "train.bin"))
+
+    valid_set = lgb.Dataset(
+        [ShardSequence(s) for s in shards["valid"]],
+        label=np.asarray(labels["valid"]),
+        reference=train_set,
+        params=dataset_params,
+        free_raw_data=True
+    ).construct()
+    valid_set.save_binary(os.path.join(cache_dir, "valid.bin"))
+    print(f"LightGBM binary datasets built in {time.perf_counter() - start:.1f}s")
+
+    # Train / valid shards are only an intermediate step; the test shards
+    # stay, they are scored with raw features
+    del labels, train_set, valid_set
+    for part in ["train", "valid"]:
+        for path in shards[part] + [os.path.join(cache_dir, f"{part}_label.f32")]:
+            os.remove(path)
+
+    encoder.save(os.path.join(cache_dir, "encoder.json"))
+    return encoder, counts
+
+
+def load_manifest(cache_dir):
+    path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# ----------------------------
+# Step 3: train from the cache
+# ----------------------------
+def params_from_model(model_path):
+    # Best lgbm config of a FLAML model (train_automl.py) as LightGBM params
+    with open(model_path, "rb") as f:
+        automl = pickle.load(f)
+    config = (automl.best_config_per_estimator or {}).get("lgbm")
+    if not config:
+        return {}, None
+
+    params = {
+        "num_leaves": int(config["num_leaves"]),
+        "min_data_in_leaf": int(config["min_child_samples"]),
+        "learning_rate": float(config["learning_rate"]),
+        "feature_fraction": float(config["colsample_bytree"]),
+        "lambda_l1": float(config["reg_alpha"]),
+        "lambda_l2": float(config["reg_lambda"])
+    }
+    if "log_max_bin" in config:
+        params["max_bin"] = (1 << int(config["log_max_bin"])) - 1
+    return params, int(config["n_estimators"])
+
+
+def train(cache_dir, params, rounds, early_stopping=20):
+    train_set = lgb.Dataset(os.path.join(cache_dir, "train.bin"), params={"verbosity": -1})
+    valid_set = lgb.Dataset(os.path.join(cache_dir, "valid.bin"), reference=train_set, params={"verbosity": -1})
+
+    evals = {}
+    booster = lgb.train(
+        params,
+        train_set,
+        num_boost_round=rounds,
+        valid_sets=[valid_set],
+        valid_names=["valid"],
+        callbacks=[
+            lgb.early_stopping(early_stopping, verbose=False),
+            lgb.log_evaluation(50),
+            lgb.record_evaluation(evals)
+        ]
+    )
+    return booster, evals
+
+
+def test_rmse(cache_dir, booster):
+    # Streamed over the test shards, at the iteration early stopping kept
+    labels = np.memmap(os.path.join(cache_dir, "test_label.f32"), dtype=np.float32, mode="r")
+    squared_error = 0.0
+    offset = 0
+    for shard in sorted(glob.glob(os.path.join(cache_dir, "test-*.npy"))):
+        X = np.load(shard, mmap_mode="r")
+        preds = booster.predict(X, num_iteration=booster.best_iteration or None)
+        squared_error += float(((preds - labels[offset:offset + len(X)]) ** 2).sum())
+        offset += len(X)
+    return (squared_error / max(1, offset)) ** 0.5
+
+
+# ============================
+# CLI
+# ============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a LightGBM speed model out of core")
+    parser.add_argument("input", nargs="?", default="safeflow_ai_simulated_dataset.csv",
+                        help="CSV, Parquet or partitioned directory")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--valid-fraction", type=float, default=VALID_FRACTION, help="rows used for early stopping")
+    parser.add_argument("--test-fraction", type=float, default=TEST_FRACTION, help="held-out rows for the final score")
+    parser.add_argument("--rounds", type=int, default=None,
+                        help="max boosting rounds, early stopping on valid (default: tuned n_estimators or 500)")
+    parser.add_argument("--params-from", default=None, help="FLAML model whose best lgbm config to use")
+    parser.add_argument("--rebuild", action="store_true", help="ignore an existing binary cache")
+    parser.add_argument("--out", default=OUT_PATH, help="lean model (.npz) to write")
+    args = parser.parse_args()
+
+    input_path = resolve_dataset_path(args.input)
+    params = dict(DEFAULT_PARAMS)
+    tuned_rounds = None
+    if args.params_from:
+        tuned, tuned_rounds = params_from_model(args.params_from)
+        params.update(tuned)
+        print(f"Using lgbm config from {args.params_from}: {tuned}")
+    rounds = args.rounds or tuned_rounds or 500
+
+    key = {
+        "source": source_fingerprint(input_path),
+        "valid_fraction": args.valid_fraction,
+        "test_fraction": args.test_fraction,
+        "seed": SEED,
+        "max_bin": params["max_bin"]
+    }
+    manifest = load_manifest(args.cache_dir)
+
+    total = time.perf_counter()
+    if args.rebuild or manifest is None or manifest["key"] != key:
+        print(f"Building binary cache from {input_path}")
+        encoder, counts = build_binary_cache(
+            input_path, args.cache_dir, params,
+            chunk_rows=args.chunk_rows, valid_fraction=args.valid_fraction,
+            test_fraction=args.test_fraction, seed=SEED
+        )
+        with open(os.path.join(args.cache_dir, "manifest.json"), "w") as f:
+            json.dump({"key": key, "input": input_path, "rows": counts}, f, indent=2)
+    else:
+        print(f"Reusing binary cache in {args.cache_dir}")
+        encoder = FeatureEncoder.load(os.path.join(args.cache_dir, "encoder.json"))
+        counts = manifest["rows"]
+
+    start = time.perf_counter()
+    booster, evals = train(args.cache_dir, params, rounds)
+    best = booster.best_iteration or len(evals["valid"]["rmse"])
+    valid_rmse = evals["valid"]["rmse"][best - 1]
+    print(f"Trained {len(evals['valid']['rmse'])} rounds (best {best}) in {time.perf_counter() - start:.1f}s")
+    print(f"Validation RMSE ({counts['valid']:,} rows, used for early stopping): {valid_rmse:.3f}")
+
+    rmse = test_rmse(args.cache_dir, booster)
+    print(f"Test RMSE ({counts['test']:,} held-out rows): {rmse:.3f}")
+
+    export_lean_booster(booster, args.out, meta={
+        "source": key["source"],
+        "rows": counts,
+        "valid_rmse": valid_rmse,
+        "test_rmse": rmse,
+        "params": params
+    })
+    encoder.save(encoder_path(args.out))
+    print(f"Saved {args.out} (+ {os.path.basename(encoder_path(args.out))}) in {time.perf_counter() - total:.1f}s total")